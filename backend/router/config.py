@@ -37,6 +37,10 @@ class Settings(BaseSettings):
     INFERENCE_CONNECT_TIMEOUT_SECONDS: int = 10
     INFERENCE_READ_TIMEOUT_SECONDS: int = 120  # Longer read timeout for streaming
     INFERENCE_WRITE_TIMEOUT_SECONDS: int = 30  # Write timeout for requests
+    INFERENCE_HTTP2: bool = True  # Multiplex streams over one TLS connection per node
+    INFERENCE_MAX_CONNECTIONS: int = 1024  # Connection pool size
+    INFERENCE_MAX_KEEPALIVE_CONNECTIONS: int = 256  # Idle connections kept open
+    INFERENCE_KEEPALIVE_EXPIRY_SECONDS: float = 60.0  # Idle connection lifetime
     REQUEST_BUDGET_SECONDS: int = 300  # Maximum total time per request
     ENABLE_CLIENT_DISCONNECT_CANCELLATION: bool = True  # Cancel on client disconnect
 
@@ -0,0 +1,68 @@
+"""
+Shared fixtures for the manual check scripts in the router root.
+
+The scripts still run on their own (``python test_hpke_end_to_end.py``), but
+collecting them together keeps interpreter startup, imports and the HTTP
+client to one per run:
+
+    pytest test_direct_inference.py test_encrypted_streaming.py \\
+        test_hpke_end_to_end.py test_harmony_integration.py
+
+Checks that talk to a running router are skipped when it is not reachable.
+"""
+
+from pathlib import Path
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from config import Settings, get_settings
+
+ROUTER_ROOT = Path(__file__).parent
+
+# Scripts whose checks are coroutines
+ASYNC_SCRIPTS = {
+    "test_direct_inference.py",
+    "test_encrypted_streaming.py",
+    "test_hpke_end_to_end.py",
+}
+
+# Scripts whose checks need a router listening on BASE_URL
+LIVE_ROUTER_SCRIPTS = {"test_encrypted_streaming.py", "test_hpke_end_to_end.py"}
+
+BASE_URL = "http://localhost:8000"
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_pycollect_makemodule(module_path):
+    """Run the root scripts' coroutine checks on one session-wide event loop."""
+    module = yield
+    if module_path.parent == ROUTER_ROOT:
+        if module_path.name in ASYNC_SCRIPTS:
+            module.add_marker(pytest.mark.asyncio(loop_scope="session"))
+        if module_path.name in LIVE_ROUTER_SCRIPTS:
+            module.add_marker(pytest.mark.usefixtures("live_router"))
+    return module
+
+
+@pytest.fixture(scope="session")
+def settings() -> Settings:
+    """Router settings, loaded once per run."""
+    return get_settings()
+
+
+@pytest.fixture(scope="session")
+def live_router():
+    """Skip when no router is listening on BASE_URL."""
+    try:
+        httpx.get(f"{BASE_URL}/health", timeout=2.0)
+    except httpx.HTTPError:
+        pytest.skip(f"router not reachable at {BASE_URL}")
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def client(live_router):
+    """One HTTP client to the router, shared by every check in the run."""
+    async with httpx.AsyncClient(timeout=30.0, base_url=BASE_URL) as client:
+        yield client
@@ -5,11 +5,17 @@ Usage: python3 create_hpke_request.py "Your question here"
 """
 
 import sys
-import json
-import base64
 from datetime import datetime, timezone
 import uuid
 
+import orjson
+import pybase64
+
+# Fixed mock HPKE fields, already base64-encoded
+_ENC_KEY = "bW9ja19lbmNhcHN1bGF0ZWRfa2V5XzMyYnl0ZXNfXw=="
+_AAD = "dGVzdF9hYWQ="
+_DEV = "bW9ja19kZXZpY2VfcHVia2V5XzMyYnl0ZXNfX19f"
+
 def create_hpke_request(question):
     """Create a complete HPKE-encrypted curl request."""
     
@@ -22,8 +28,7 @@ def create_hpke_request(question):
     }
     
     # Encode as base64 (simulating HPKE encryption)
-    payload_json = json.dumps(payload)
-    ciphertext = base64.b64encode(payload_json.encode('utf-8')).decode('ascii')
+    ciphertext = pybase64.b64encode_as_string(orjson.dumps(payload))
     
     # Generate current timestamp
     timestamp = datetime.now(timezone.utc).isoformat()
@@ -32,7 +37,7 @@ def create_hpke_request(question):
     request_id = f"custom-question-{str(uuid.uuid4())[:8]}"
     
     # Create the curl command (single line to avoid JSON parsing issues)
-    curl_command = f'''curl -X POST http://localhost:8000/api/chat -H "Content-Type: application/json" -d '{{"encapsulated_key":"bW9ja19lbmNhcHN1bGF0ZWRfa2V5XzMyYnl0ZXNfXw==","ciphertext":"{ciphertext}","aad":"dGVzdF9hYWQ=","timestamp":"{timestamp}","request_id":"{request_id}","device_pubkey":"bW9ja19kZXZpY2VfcHVia2V5XzMyYnl0ZXNfX19f"}}\'
+    curl_command = f'''curl -X POST http://localhost:8000/api/chat -H "Content-Type: application/json" -d '{{"encapsulated_key":"{_ENC_KEY}","ciphertext":"{ciphertext}","aad":"{_AAD}","timestamp":"{timestamp}","request_id":"{request_id}","device_pubkey":"{_DEV}"}}\'
 '''
     
     return curl_command
@@ -5,13 +5,26 @@ Usage: curl ... | python3 decode_harmony_response.py
 """
 
 import sys
-import json
-import base64
 import re
 
+import orjson
+import pybase64
+
+# Harmony literal -> (token type, channel it switches to)
+_TOKEN_MAP = {
+    '<|channel|>': ('channel_marker', None),
+    'final': ('channel_name', 'final'),
+    'analysis': ('channel_name', 'analysis'),
+    'commentary': ('channel_name', 'commentary'),
+    '<|message|>': ('message_marker', None),
+    '<|start|>': ('control_token', None),
+    '<|end|>': ('control_token', None),
+    '<|return|>': ('control_token', None),
+}
+
 class HarmonyResponseDecoder:
     def __init__(self):
-        self.full_response = ""
+        self.full_response_parts = []
         self.chunk_count = 0
         self.current_channel = None
         self.channels = {
@@ -20,23 +33,27 @@ class HarmonyResponseDecoder:
             'commentary': []
         }
         
+    @property
+    def full_response(self):
+        """All decoded content so far, joined on demand."""
+        return ''.join(self.full_response_parts)
+
     def parse_harmony_content(self, content):
         """Parse Harmony special tokens and channel content."""
-        # Look for channel markers
-        if content == '<|channel|>':
-            return 'channel_marker', content
-        elif content in ['final', 'analysis', 'commentary']:
-            self.current_channel = content
-            return 'channel_name', content
-        elif content == '<|message|>':
-            return 'message_marker', content
-        elif content in ['<|start|>', '<|end|>', '<|return|>']:
-            return 'control_token', content
-        else:
+        token = _TOKEN_MAP.get(content)
+        if token is None:
             return 'content', content
+        token_type, channel = token
+        if channel:
+            self.current_channel = channel
+        return token_type, content
     
     def add_content(self, content):
         """Add content to the appropriate channel."""
+        # Short tokens are interned so the _TOKEN_MAP lookup and channel keys
+        # (identifier-like literals, already interned) compare by identity
+        if len(content) < 16:
+            content = sys.intern(content)
         token_type, token_content = self.parse_harmony_content(content)
         
         if token_type == 'content' and self.current_channel:
@@ -56,6 +73,89 @@ class HarmonyResponseDecoder:
         """Get the commentary content."""
         return ''.join(self.channels['commentary'])
 
+# Chunks decoded per pybase64 call; token-sized payloads spend more time in
+# call overhead than in the decode itself
+DECODE_BATCH_SIZE = 16
+
+
+def _decode_run(run):
+    """Decode a run of chunks that can be joined, falling back per chunk."""
+    if len(run) > 1:
+        try:
+            # validate=True so skipped characters can't shift the split points
+            blob = pybase64.b64decode(''.join(run), validate=True)
+        except Exception:
+            pass  # Decode one by one below to report the bad chunk
+        else:
+            parts = []
+            start = 0
+            for chunk in run[:-1]:
+                end = start + len(chunk) // 4 * 3
+                parts.append(blob[start:end])
+                start = end
+            parts.append(blob[start:])
+            return parts
+
+    parts = []
+    for chunk in run:
+        try:
+            parts.append(pybase64.b64decode(chunk, validate=False))
+        except Exception as e:
+            parts.append(e)
+    return parts
+
+
+def _decode_batch(ciphertexts):
+    """
+    Decode base64 chunks, returning bytes (or the decode error) for each.
+
+    Base64 only concatenates cleanly on unpadded 4-character boundaries, so
+    consecutive chunks are joined into one decode until a chunk with padding
+    or an odd length ends the run.
+    """
+    decoded = []
+    run = []
+    for chunk in ciphertexts:
+        run.append(chunk)
+        if not isinstance(chunk, str) or len(chunk) % 4 or chunk.endswith('='):
+            decoded.extend(_decode_run(run))
+            run = []
+    if run:
+        decoded.extend(_decode_run(run))
+    return decoded
+
+
+def _show_chunk(decoder, decoded):
+    """Record one decoded chunk and print its debug line."""
+    try:
+        if isinstance(decoded, Exception):
+            raise decoded
+        content = decoded.decode('utf-8')
+        
+        decoder.chunk_count += 1
+        decoder.full_response_parts.append(content)
+        
+        # Parse and categorize content
+        token_type, token_content = decoder.add_content(content)
+        
+        # Show debug info
+        if token_type == 'channel_marker':
+            print(f"\n📍 Channel Marker Found")
+        elif token_type == 'channel_name':
+            print(f"🔀 Switched to channel: {token_content}")
+        elif token_type == 'message_marker':
+            print(f"📝 Message Content Starts")
+        elif token_type == 'control_token':
+            print(f"🎛️  Control: {token_content}")
+        else:
+            # Only show content for debugging, don't spam
+            if decoder.chunk_count <= 10 or decoder.chunk_count % 20 == 0:
+                channel_info = f"[{decoder.current_channel}]" if decoder.current_channel else "[unknown]"
+                print(f"Chunk {decoder.chunk_count:3d} {channel_info}: {repr(content[:50])}")
+                
+    except Exception as e:
+        print(f"Failed to decode chunk {decoder.chunk_count}: {e}")
+
 def decode_harmony_response():
     """Decode streaming HPKE response chunks with Harmony channel parsing."""
     
@@ -64,63 +164,46 @@ def decode_harmony_response():
     
     decoder = HarmonyResponseDecoder()
     
-    for line in sys.stdin:
-        line = line.strip()
-        
-        # Skip empty lines
-        if not line:
+    # Ciphertexts waiting to be decoded together by flush()
+    pending = []
+
+    def flush():
+        for decoded in _decode_batch(pending):
+            _show_chunk(decoder, decoded)
+        pending.clear()
+
+    # Read raw bytes: only data lines are sliced, and nothing is decoded to
+    # str except the chunk content itself
+    for line in sys.stdin.buffer:
+        # Parse SSE format; blank and event: lines carry no chunk
+        if not line.startswith(b"data:"):
             continue
+
+        try:
+            # Extract JSON from "data: {...}"
+            json_str = line[5:].strip()  # Remove "data: "
             
-        # Parse SSE format
-        if line.startswith("event:") or line.startswith("data:"):
-            if line.startswith("data:"):
-                try:
-                    # Extract JSON from "data: {...}"
-                    json_str = line[5:].strip()  # Remove "data: "
-                    
-                    if json_str == "[DONE]":
-                        print("Stream completed.")
-                        break
-                        
-                    data = json.loads(json_str)
+            if json_str == b"[DONE]":
+                flush()
+                print("Stream completed.")
+                break
+                
+            data = orjson.loads(json_str)
+            
+            # Extract encrypted chunk
+            if "ciphertext" in data:
+                pending.append(data["ciphertext"])
+                if len(pending) >= DECODE_BATCH_SIZE:
+                    flush()
                     
-                    # Extract encrypted chunk
-                    if "ciphertext" in data:
-                        encrypted_content = data["ciphertext"]
-                        
-                        # Decode base64 content (simplified for demo)
-                        try:
-                            decoded_bytes = base64.b64decode(encrypted_content)
-                            content = decoded_bytes.decode('utf-8')
-                            
-                            decoder.chunk_count += 1
-                            decoder.full_response += content
-                            
-                            # Parse and categorize content
-                            token_type, token_content = decoder.add_content(content)
-                            
-                            # Show debug info
-                            if token_type == 'channel_marker':
-                                print(f"\n📍 Channel Marker Found")
-                            elif token_type == 'channel_name':
-                                print(f"🔀 Switched to channel: {token_content}")
-                            elif token_type == 'message_marker':
-                                print(f"📝 Message Content Starts")
-                            elif token_type == 'control_token':
-                                print(f"🎛️  Control: {token_content}")
-                            else:
-                                # Only show content for debugging, don't spam
-                                if decoder.chunk_count <= 10 or decoder.chunk_count % 20 == 0:
-                                    channel_info = f"[{decoder.current_channel}]" if decoder.current_channel else "[unknown]"
-                                    print(f"Chunk {decoder.chunk_count:3d} {channel_info}: {repr(content[:50])}")
-                                    
-                        except Exception as e:
-                            print(f"Failed to decode chunk {decoder.chunk_count}: {e}")
-                            
-                except json.JSONDecodeError as e:
-                    print(f"Failed to parse JSON: {e}")
-                except Exception as e:
-                    print(f"Error processing line: {e}")
+        except orjson.JSONDecodeError as e:
+            flush()
+            print(f"Failed to parse JSON: {e}")
+        except Exception as e:
+            flush()
+            print(f"Error processing line: {e}")
+    else:
+        flush()
 
     # Show results by channel
     print("\n" + "=" * 50)
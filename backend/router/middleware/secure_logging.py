@@ -10,9 +10,8 @@ Implements comprehensive logging security to prevent sensitive data leakage:
 
 import re
 import logging
-import hashlib
-from typing import Any, Optional, Set
-from datetime import datetime
+import time
+from typing import Any, FrozenSet, Optional, Set
 from contextlib import contextmanager
 
 from fastapi import Request, Response
@@ -21,6 +20,11 @@ from starlette.types import ASGIApp
 
 from config import get_settings
 
+try:
+    import hyperscan
+except ImportError:  # Native wheel missing for this platform
+    hyperscan = None
+
 settings = get_settings()
 
 
@@ -29,36 +33,51 @@ class SecureLoggingFilter(logging.Filter):
     Logging filter that scrubs sensitive data from log records.
     """
 
-    # Patterns for sensitive data that should be scrubbed
+    # Patterns for sensitive data that should be scrubbed, compiled once.
+    # Order matters: later patterns see the output of earlier ones.
     SENSITIVE_PATTERNS = [
-        # HPKE encrypted data
-        (r'"encapsulated_key":\s*"[^"]*"', '"encapsulated_key": "[SCRUBBED]"'),
-        (r'"ciphertext":\s*"[^"]*"', '"ciphertext": "[SCRUBBED]"'),
-        (r'"device_pubkey":\s*"[^"]*"', '"device_pubkey": "[SCRUBBED]"'),
-        # Authentication and API keys
-        (r"Authorization:\s*Bearer\s+[^\s]+", "Authorization: Bearer [SCRUBBED]"),
-        (r"X-API-Key:\s*[^\s]+", "X-API-Key: [SCRUBBED]"),
-        (r'"api_key":\s*"[^"]*"', '"api_key": "[SCRUBBED]"'),
-        # Message content (prompts and completions)
-        (r'"content":\s*"[^"]*"', '"content": "[CONTENT_SCRUBBED]"'),
-        (r'"messages":\s*\[[^\]]*\]', '"messages": ["[MESSAGES_SCRUBBED]"]'),
-        # Base64 encoded data (likely sensitive)
-        (r'"[^"]*":\s*"[A-Za-z0-9+/]{20,}={0,2}"', '"[KEY]": "[B64_SCRUBBED]"'),
-        # IP addresses (for privacy)
-        (r"\b(?:\d{1,3}\.){3}\d{1,3}\b", "[IP_SCRUBBED]"),
-        # UUIDs and request IDs (can be correlation risks)
-        (r'"request_id":\s*"[^"]*"', '"request_id": "[ID_SCRUBBED]"'),
-        (
-            r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b",
-            "[UUID_SCRUBBED]",
-        ),
-        # File paths that might contain sensitive info
-        (
-            r"/[a-zA-Z0-9._/-]*(?:key|cert|secret|private)[a-zA-Z0-9._/-]*",
-            "[PATH_SCRUBBED]",
-        ),
+        (re.compile(pattern, re.IGNORECASE), replacement)
+        for pattern, replacement in [
+            # HPKE encrypted data
+            (r'"encapsulated_key":\s*"[^"]*"', '"encapsulated_key": "[SCRUBBED]"'),
+            (r'"ciphertext":\s*"[^"]*"', '"ciphertext": "[SCRUBBED]"'),
+            (r'"device_pubkey":\s*"[^"]*"', '"device_pubkey": "[SCRUBBED]"'),
+            # Authentication and API keys
+            (r"Authorization:\s*Bearer\s+[^\s]+", "Authorization: Bearer [SCRUBBED]"),
+            (r"X-API-Key:\s*[^\s]+", "X-API-Key: [SCRUBBED]"),
+            (r'"api_key":\s*"[^"]*"', '"api_key": "[SCRUBBED]"'),
+            # Message content (prompts and completions)
+            (r'"content":\s*"[^"]*"', '"content": "[CONTENT_SCRUBBED]"'),
+            (r'"messages":\s*\[[^\]]*\]', '"messages": ["[MESSAGES_SCRUBBED]"]'),
+            # Base64 encoded data (likely sensitive)
+            (r'"[^"]*":\s*"[A-Za-z0-9+/]{20,}={0,2}"', '"[KEY]": "[B64_SCRUBBED]"'),
+            # IP addresses (for privacy)
+            (r"\b(?:\d{1,3}\.){3}\d{1,3}\b", "[IP_SCRUBBED]"),
+            # UUIDs and request IDs (can be correlation risks)
+            (r'"request_id":\s*"[^"]*"', '"request_id": "[ID_SCRUBBED]"'),
+            (
+                r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b",
+                "[UUID_SCRUBBED]",
+            ),
+            # File paths that might contain sensitive info
+            (
+                r"/[a-zA-Z0-9._/-]*(?:key|cert|secret|private)[a-zA-Z0-9._/-]*",
+                "[PATH_SCRUBBED]",
+            ),
+        ]
     ]
 
+    # A UUID needs four hyphens, which most log lines don't have; filter()
+    # counts them before running this regex
+    _UUID_PATTERN = next(
+        pattern
+        for pattern, replacement in SENSITIVE_PATTERNS
+        if replacement == "[UUID_SCRUBBED]"
+    )
+
+    # Below this size the per-pattern re passes are cheaper than a scan
+    PREFILTER_MIN_LENGTH = 64
+
     def filter(self, record: logging.LogRecord) -> bool:
         """
         Filter and scrub sensitive data from log records.
@@ -67,8 +86,11 @@ class SecureLoggingFilter(logging.Filter):
             message = record.getMessage()
 
             # Apply scrubbing patterns
-            for pattern, replacement in self.SENSITIVE_PATTERNS:
-                message = re.sub(pattern, replacement, message, flags=re.IGNORECASE)
+            if _may_be_sensitive(message, self.PREFILTER_MIN_LENGTH):
+                for pattern, replacement in self.SENSITIVE_PATTERNS:
+                    if pattern is self._UUID_PATTERN and message.count("-") < 4:
+                        continue
+                    message = pattern.sub(replacement, message)
 
             # Update the record
             record.msg = message
@@ -77,6 +99,74 @@ class SecureLoggingFilter(logging.Filter):
         return True
 
 
+# Python's str \s also matches \x1c-\x1f, Hyperscan's does not
+_HS_WHITESPACE = r"\t\n\x0b\f\r \x1c-\x1f"
+
+
+def _build_prefilter() -> Optional["hyperscan.Database"]:
+    """
+    Compile every scrubbing pattern into one Hyperscan database, so a single
+    pass over the message tells whether any of them can match.
+
+    Returns None without Hyperscan; messages then go straight to the regexes.
+    """
+    if hyperscan is None:
+        return None
+
+    expressions = [
+        pattern.pattern.replace(r"[^\s]", f"[^{_HS_WHITESPACE}]")
+        .replace(r"\s", f"[{_HS_WHITESPACE}]")
+        .encode("ascii")
+        for pattern, _ in SecureLoggingFilter.SENSITIVE_PATTERNS
+    ]
+    database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    database.compile(
+        expressions=expressions,
+        ids=list(range(len(expressions))),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH]
+        * len(expressions),
+    )
+    return database
+
+
+_PREFILTER = _build_prefilter()
+
+# The path pattern needs '/' plus one of these words
+_PATH_WORDS = ("key", "cert", "secret", "private")
+
+
+def _stop_on_match(*_) -> bool:
+    return True  # Any hit is enough; halts the scan
+
+
+def _may_be_sensitive(message: str, min_length: int) -> bool:
+    """
+    Return False only when no scrubbing pattern can match the message.
+
+    Non-ASCII messages skip both checks below, since Unicode case folding and
+    character classes differ from plain lower() and Hyperscan's byte semantics.
+    """
+    if not message.isascii():
+        return True
+    # What each pattern needs at minimum: '":' for the JSON keys, three dots
+    # for an IP, four hyphens for a UUID, ':' with "bearer" or "x-api-key" for
+    # the headers, and '/' with a path word. Plain log lines carry some '.',
+    # '-' or '/', so counting rules far more of them out than presence does.
+    if '":' not in message and message.count(".") < 3 and message.count("-") < 4:
+        lowered = message.lower()
+        if not (
+            ":" in message and ("bearer" in lowered or "x-api-key" in lowered)
+        ) and not ("/" in message and any(word in lowered for word in _PATH_WORDS)):
+            return False
+    if _PREFILTER is None or len(message) < min_length:
+        return True
+    try:
+        _PREFILTER.scan(message.encode("ascii"), match_event_handler=_stop_on_match)
+    except hyperscan.ScanTerminated:
+        return True
+    return False
+
+
 class SecureLoggingMiddleware(BaseHTTPMiddleware):
     """
     Middleware that implements secure logging policies.
@@ -86,14 +176,16 @@ class SecureLoggingMiddleware(BaseHTTPMiddleware):
     NEVER_LOG_PATHS: Set[str] = {"/api/chat", "/inference", "/api/chat/debug"}
 
     # Headers that should never be logged
-    SENSITIVE_HEADERS: Set[str] = {
-        "authorization",
-        "x-api-key",
-        "cookie",
-        "x-forwarded-for",
-        "x-real-ip",
-        "x-client-ip",
-    }
+    SENSITIVE_HEADERS: FrozenSet[str] = frozenset(
+        {
+            "authorization",
+            "x-api-key",
+            "cookie",
+            "x-forwarded-for",
+            "x-real-ip",
+            "x-client-ip",
+        }
+    )
 
     def __init__(self, app: ASGIApp):
         super().__init__(app)
@@ -103,7 +195,7 @@ class SecureLoggingMiddleware(BaseHTTPMiddleware):
         """
         Process request/response with secure logging.
         """
-        start_time = datetime.utcnow()
+        start_ns = time.perf_counter_ns()
         request_id = self._get_request_id(request)
 
         # Log request start (minimal info only)
@@ -115,44 +207,47 @@ class SecureLoggingMiddleware(BaseHTTPMiddleware):
 
             # Log successful response
             if not settings.DISABLE_ACCESS_LOGS:
-                self._log_response(request, response, start_time, request_id)
+                self._log_response(request, response, start_ns, request_id)
 
             return response
 
         except Exception as e:
             # Log error without sensitive data
-            self._log_error(request, e, start_time, request_id)
+            self._log_error(request, e, start_ns, request_id)
             raise
 
     def _get_request_id(self, request: Request) -> str:
         """
         Generate or extract request ID for correlation.
         """
-        # Use hash of timestamp + path for correlation without leaking data
-        correlation_data = f"{datetime.utcnow().isoformat()}{request.url.path}"
-        return hashlib.sha256(correlation_data.encode()).hexdigest()[:8]
+        # Hash path + monotonic clock for correlation without leaking data; the
+        # built-in (SipHash) hash is plenty for an 8-hex-digit ID
+        return f"{hash((request.url.path, time.monotonic_ns())) & 0xFFFFFFFF:08x}"
 
     def _log_request_start(self, request: Request, request_id: str):
         """
         Log request start with minimal information.
         """
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
         # Only log safe information
         safe_info = {
             "request_id": request_id,
             "method": request.method,
             "path": request.url.path,
-            "timestamp": datetime.utcnow().isoformat(),
         }
 
-        # Add safe headers only
-        safe_headers = {}
-        for header, value in request.headers.items():
-            if header.lower() not in self.SENSITIVE_HEADERS:
-                # Still truncate long headers
-                safe_headers[header] = value[:100] if len(value) > 100 else value
-
-        if safe_headers and settings.LOG_LEVEL == "DEBUG":
-            safe_info["headers"] = safe_headers
+        # Add safe headers only (ASGI header names are already lower-case),
+        # still truncating long values
+        if settings.LOG_LEVEL == "DEBUG":
+            safe_headers = {
+                header: value[:100]
+                for header, value in request.headers.items()
+                if header not in self.SENSITIVE_HEADERS
+            }
+            if safe_headers:
+                safe_info["headers"] = safe_headers
 
         self.logger.info(f"Request started: {safe_info}")
 
@@ -160,13 +255,25 @@ class SecureLoggingMiddleware(BaseHTTPMiddleware):
         self,
         request: Request,
         response: Response,
-        start_time: datetime,
+        start_ns: int,
         request_id: str,
     ):
         """
         Log response with minimal information.
         """
-        duration = (datetime.utcnow() - start_time).total_seconds()
+        # Log level based on status code
+        if response.status_code >= 500:
+            level, summary = logging.ERROR, "Request failed"
+        elif response.status_code >= 400:
+            level, summary = logging.WARNING, "Request client error"
+        else:
+            level, summary = logging.INFO, "Request completed"
+
+        # Nothing below is needed when the level is filtered out
+        if not self.logger.isEnabledFor(level):
+            return
+
+        duration = (time.perf_counter_ns() - start_ns) / 1e9
 
         safe_info = {
             "request_id": request_id,
@@ -175,21 +282,18 @@ class SecureLoggingMiddleware(BaseHTTPMiddleware):
             "path": request.url.path,
         }
 
-        # Log level based on status code
-        if response.status_code >= 500:
-            self.logger.error(f"Request failed: {safe_info}")
-        elif response.status_code >= 400:
-            self.logger.warning(f"Request client error: {safe_info}")
-        else:
-            self.logger.info(f"Request completed: {safe_info}")
+        self.logger.log(level, f"{summary}: {safe_info}")
 
     def _log_error(
-        self, request: Request, error: Exception, start_time: datetime, request_id: str
+        self, request: Request, error: Exception, start_ns: int, request_id: str
     ):
         """
         Log errors without exposing sensitive data.
         """
-        duration = (datetime.utcnow() - start_time).total_seconds()
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
+
+        duration = (time.perf_counter_ns() - start_ns) / 1e9
 
         # Only log error type and general info, not details
         safe_error_info = {
@@ -254,69 +358,97 @@ def secure_operation_context(operation_name: str, request_id: Optional[str] = No
     Context manager for secure operations that handles logging and cleanup.
     """
     logger = logging.getLogger("llm_router.security")
-    start_time = datetime.utcnow()
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    start = time.perf_counter()
 
     # Generate correlation ID if not provided
     if not request_id:
-        request_id = hashlib.sha256(
-            f"{operation_name}{start_time.isoformat()}".encode()
-        ).hexdigest()[:8]
+        request_id = f"{hash((operation_name, time.monotonic_ns())) & 0xFFFFFFFF:08x}"
 
     try:
-        logger.debug(f"Starting secure operation: {operation_name} [{request_id}]")
+        if debug_enabled:
+            logger.debug(f"Starting secure operation: {operation_name} [{request_id}]")
         yield request_id
 
-        duration = (datetime.utcnow() - start_time).total_seconds()
-        logger.debug(
-            f"Completed secure operation: {operation_name} [{request_id}] in {duration:.3f}s"
-        )
+        if debug_enabled:
+            duration = time.perf_counter() - start
+            logger.debug(
+                f"Completed secure operation: {operation_name} [{request_id}] in {duration:.3f}s"
+            )
 
     except Exception as e:
-        duration = (datetime.utcnow() - start_time).total_seconds()
+        duration = time.perf_counter() - start
         logger.error(
             f"Failed secure operation: {operation_name} [{request_id}] - {type(e).__name__} after {duration:.3f}s"
         )
         raise
 
 
+# Deleting these bytes leaves nothing behind iff a string is pure base64
+_B64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+
+
+# Dict keys containing any of these are scrubbed outright
+_SENSITIVE_KEY_PARTS = (
+    "password",
+    "key",
+    "secret",
+    "token",
+    "auth",
+    "cipher",
+    "content",
+    "message",
+)
+
+# Containers nested deeper than this are scrubbed instead of walked
+MAX_SCRUB_DEPTH = 32
+
+
+def _scrub_scalar(data: Any) -> Any:
+    """Scrub a non-container value."""
+    if isinstance(data, str):
+        # Scrub long strings that might be encoded data
+        if (
+            len(data) > 50
+            and data.isascii()
+            and not data.encode("ascii").translate(None, _B64_ALPHABET)
+        ):
+            return "[BASE64_SCRUBBED]"
+    return data
+
+
 def scrub_sensitive_data(data: Any) -> Any:
     """
     Utility function to scrub sensitive data from any object.
     Used for safe debugging and logging.
+
+    Walks nested dicts and lists with an explicit stack rather than recursion.
     """
-    if isinstance(data, dict):
-        scrubbed = {}
-        for key, value in data.items():
+    if not isinstance(data, (dict, list)):
+        return _scrub_scalar(data)
+
+    root = {} if isinstance(data, dict) else []
+    # (original container, scrubbed copy being filled, nesting depth)
+    stack = [(data, root, 1)]
+    while stack:
+        source, target, depth = stack.pop()
+        is_dict = isinstance(source, dict)
+        for key, value in source.items() if is_dict else enumerate(source):
             # Scrub keys that are likely sensitive
-            if any(
-                sensitive in key.lower()
-                for sensitive in [
-                    "password",
-                    "key",
-                    "secret",
-                    "token",
-                    "auth",
-                    "cipher",
-                    "content",
-                    "message",
-                ]
-            ):
-                scrubbed[key] = "[SCRUBBED]"
+            if is_dict and any(part in key.lower() for part in _SENSITIVE_KEY_PARTS):
+                scrubbed = "[SCRUBBED]"
+            elif isinstance(value, (dict, list)):
+                if depth >= MAX_SCRUB_DEPTH:
+                    scrubbed = "[SCRUBBED]"
+                else:
+                    scrubbed = {} if isinstance(value, dict) else []
+                    stack.append((value, scrubbed, depth + 1))
             else:
-                scrubbed[key] = scrub_sensitive_data(value)
-        return scrubbed
-
-    elif isinstance(data, list):
-        return [scrub_sensitive_data(item) for item in data]
+                scrubbed = _scrub_scalar(value)
 
-    elif isinstance(data, str):
-        # Scrub long strings that might be encoded data
-        if len(data) > 50 and all(
-            c in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
-            for c in data
-        ):
-            return "[BASE64_SCRUBBED]"
-        return data
+            if is_dict:
+                target[key] = scrubbed
+            else:
+                target.append(scrubbed)
 
-    else:
-        return data
+    return root
@@ -25,6 +25,7 @@ class CircuitBreaker:
         # Circuit breaker state
         self.state = CircuitBreakerState.CLOSED
         self.failure_count = 0
+        # time.monotonic() of the last failure, immune to wall-clock jumps
         self.last_failure_time: Optional[float] = None
         self.success_count = 0
 
@@ -41,23 +42,24 @@ class CircuitBreaker:
             return True
 
         self.total_requests += 1
-        current_time = time.time()
 
-        if self.state == CircuitBreakerState.CLOSED:
+        # Fast path: the breaker is closed for almost every request, so this
+        # branch is checked first and never reads the clock
+        if self.state is CircuitBreakerState.CLOSED:
             return True
 
-        elif self.state == CircuitBreakerState.OPEN:
+        elif self.state is CircuitBreakerState.OPEN:
             # Check if enough time has passed to try half-open
             if (
-                self.last_failure_time
-                and current_time - self.last_failure_time
+                self.last_failure_time is not None
+                and time.monotonic() - self.last_failure_time
                 >= self.settings.CIRCUIT_RESET_SECONDS
             ):
                 self._transition_to_half_open()
                 return True
             return False
 
-        elif self.state == CircuitBreakerState.HALF_OPEN:
+        elif self.state is CircuitBreakerState.HALF_OPEN:
             # Allow limited requests to test service recovery
             return True
 
@@ -84,7 +86,7 @@ class CircuitBreaker:
 
         self.total_failures += 1
         self.failure_count += 1
-        self.last_failure_time = time.time()
+        self.last_failure_time = time.monotonic()
 
         if self.state == CircuitBreakerState.CLOSED:
             if self.failure_count >= self.settings.CIRCUIT_BREAKER_THRESHOLD:
@@ -9,8 +9,9 @@ Documentation: https://cookbook.openai.com/articles/openai-harmony
 GitHub: https://github.com/openai/harmony
 """
 
+import functools
 import logging
-from typing import Dict, List, Optional, Any, AsyncGenerator
+from typing import Dict, List, Optional, Any, AsyncGenerator, Tuple
 from openai_harmony import (
     load_harmony_encoding,
     HarmonyEncodingName,
@@ -21,6 +22,20 @@ from openai_harmony import (
     RenderConversationConfig,
 )
 
+# Mobile-optimized system prompt for conciseness
+MOBILE_SYSTEM_PROMPT = (
+    "You are an AI assistant optimized for mobile chat. "
+    "Provide concise, direct answers. For simple questions, respond in 1-2 sentences. "
+    "For complex questions, use brief bullet points instead of tables or long explanations. "
+    "Prioritize clarity and brevity over comprehensive detail."
+)
+
+
+@functools.cache
+def _load_harmony_encoding():
+    """Load the gpt-oss Harmony encoding once per process; it parses a large BPE vocab."""
+    return load_harmony_encoding(HarmonyEncodingName.HARMONY_GPT_OSS)
+
 
 class HarmonyService:
     """
@@ -30,9 +45,64 @@ class HarmonyService:
     specifically optimized for the gpt-oss 20B model.
     """
 
+    # Map standard roles to Harmony roles; unknown roles fall back to USER
+    _ROLE_MAP = {
+        "system": Role.SYSTEM,
+        "user": Role.USER,
+        "assistant": Role.ASSISTANT,
+        "developer": Role.DEVELOPER,
+        "tool": Role.TOOL,
+    }
+
+    _EFFORT_MAP = {
+        "low": ReasoningEffort.LOW,
+        "medium": ReasoningEffort.MEDIUM,
+        "high": ReasoningEffort.HIGH,
+    }
+
     def __init__(self):
         """Initialize Harmony encoding for gpt-oss model."""
-        self.encoding = load_harmony_encoding(HarmonyEncodingName.HARMONY_GPT_OSS)
+        self.encoding = _load_harmony_encoding()
+        # Earlier turns of a chat repeat on every request as the history
+        # grows; cache each message's tokens so only new turns are rendered
+        self._render_message = functools.lru_cache(maxsize=1024)(
+            self._render_single_message
+        )
+
+    def _render_single_message(
+        self, role: Role, content: str, effort: ReasoningEffort
+    ) -> Tuple[int, ...]:
+        """Render one message as a conversation without a completion turn."""
+        conversation = Conversation.from_messages(
+            [Message.from_role_and_content(role, content)]
+        )
+        config = RenderConversationConfig(reasoning_effort=effort)
+        return tuple(self.encoding.render_conversation(conversation, config=config))
+
+    def _to_harmony_messages(
+        self, messages: List[Dict[str, str]]
+    ) -> List[Tuple[Role, str]]:
+        """Convert standard messages to Harmony (role, content) pairs."""
+        harmony_messages = []
+        
+        # Add system prompt if no system message exists
+        has_system_message = any(msg.get("role", "").lower() == "system" for msg in messages)
+        if not has_system_message:
+            harmony_messages.append((Role.SYSTEM, MOBILE_SYSTEM_PROMPT))
+        
+        role_map = self._ROLE_MAP
+        for msg in messages:
+            role_str = msg.get("role", "user").lower()
+            content = msg.get("content", "")
+            role = role_map.get(role_str, Role.USER)
+            
+            # Enhance existing system prompt with mobile optimization
+            if role is Role.SYSTEM and MOBILE_SYSTEM_PROMPT not in content:
+                content = f"{content}\n\n{MOBILE_SYSTEM_PROMPT}"
+            
+            harmony_messages.append((role, content))
+        
+        return harmony_messages
 
     def prepare_conversation(
         self,
@@ -50,71 +120,43 @@ class HarmonyService:
             List of token IDs prepared for model completion
         """
         try:
-            # Add mobile-optimized system prompt for conciseness
-            mobile_system_prompt = (
-                "You are an AI assistant optimized for mobile chat. "
-                "Provide concise, direct answers. For simple questions, respond in 1-2 sentences. "
-                "For complex questions, use brief bullet points instead of tables or long explanations. "
-                "Prioritize clarity and brevity over comprehensive detail."
-            )
-            
-            # Convert standard messages to Harmony Message objects
-            harmony_messages = []
-            
-            # Add system prompt if no system message exists
-            has_system_message = any(msg.get("role", "").lower() == "system" for msg in messages)
-            if not has_system_message:
-                system_message = Message.from_role_and_content(Role.SYSTEM, mobile_system_prompt)
-                harmony_messages.append(system_message)
-            
-            for msg in messages:
-                role_str = msg.get("role", "user").lower()
-                content = msg.get("content", "")
-                
-                # Map standard roles to Harmony roles
-                if role_str == "system":
-                    role = Role.SYSTEM
-                    # Enhance existing system prompt with mobile optimization
-                    if mobile_system_prompt not in content:
-                        content = f"{content}\n\n{mobile_system_prompt}"
-                elif role_str == "user":
-                    role = Role.USER
-                elif role_str == "assistant":
-                    role = Role.ASSISTANT
-                elif role_str == "developer":
-                    role = Role.DEVELOPER
-                elif role_str == "tool":
-                    role = Role.TOOL
-                else:
-                    role = Role.USER  # Default fallback
-                
-                harmony_message = Message.from_role_and_content(role, content)
-                harmony_messages.append(harmony_message)
-            
-            # Create Harmony conversation
-            conversation = Conversation.from_messages(harmony_messages)
+            if len(messages) == 1 and messages[0].get("role", "user").lower() == "user":
+                # Common mobile case: one user message, so the default system
+                # prompt (already cached as a prefix) plus that message
+                harmony_messages = [
+                    (Role.SYSTEM, MOBILE_SYSTEM_PROMPT),
+                    (Role.USER, messages[0].get("content", "")),
+                ]
+            else:
+                harmony_messages = self._to_harmony_messages(messages)
             
             # Set up reasoning effort configuration
-            effort_mapping = {
-                "low": ReasoningEffort.LOW,
-                "medium": ReasoningEffort.MEDIUM, 
-                "high": ReasoningEffort.HIGH
-            }
-            effort = effort_mapping.get(reasoning_effort, ReasoningEffort.MEDIUM)
+            effort = self._EFFORT_MAP.get(reasoning_effort, ReasoningEffort.MEDIUM)
             
-            # Render conversation for model completion with reasoning effort
+            # Render conversation for model completion with reasoning effort.
+            # Messages render independently, so the cached tokens of each
+            # history message plus the newest message and the assistant turn
+            # equal a full render.
             config = RenderConversationConfig(
                 reasoning_effort=effort,
             )
+            prefix_tokens = [
+                token
+                for role, content in harmony_messages[:-1]
+                for token in self._render_message(role, content, effort)
+            ]
             
+            role, content = harmony_messages[-1]
+            last_turn = Conversation.from_messages(
+                [Message.from_role_and_content(role, content)]
+            )
             tokens = self.encoding.render_conversation_for_completion(
-                conversation, 
+                last_turn, 
                 Role.ASSISTANT,
                 config=config
             )
             
-            
-            return tokens
+            return [*prefix_tokens, *tokens]
             
         except Exception as e:
             logging.error(f"Failed to prepare Harmony conversation: {e}")
@@ -1,13 +1,19 @@
 import asyncio
 import logging
+import random
 import time
-from typing import Dict, List, Set
-from dataclasses import dataclass, field
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Tuple
+from dataclasses import dataclass, field, replace
 from enum import Enum
 
 import httpx
 from config import Settings
 
+# llama.cpp liveness endpoint: 200 with a tiny body once the model is loaded,
+# unlike /v1/models which serializes the model list on every probe
+HEALTH_PATH = "/health"
+
 
 class NodeStatus(Enum):
     HEALTHY = "healthy"
@@ -15,7 +21,7 @@ class NodeStatus(Enum):
     UNKNOWN = "unknown"
 
 
-@dataclass
+@dataclass(slots=True)
 class NodeHealth:
     endpoint: str
     status: NodeStatus = NodeStatus.UNKNOWN
@@ -33,16 +39,19 @@ class HealthMonitor:
     def __init__(self, settings: Settings):
         self.settings = settings
         self.nodes: Dict[str, NodeHealth] = {}
-        self.healthy_nodes: Set[str] = set()
-        self.current_node_index = 0
-        self.lock = asyncio.Lock()
+        self.healthy_nodes: FrozenSet[str] = frozenset()
+        self._healthy_snapshot: Tuple[str, ...] = ()
+        # In-flight streams per endpoint, for power-of-two-choices selection
+        self._inflight: Dict[str, int] = defaultdict(int)
         self.health_check_task: asyncio.Task = None
         self.client: httpx.AsyncClient = None
+        self.uds_client: httpx.AsyncClient = None
+        self._endpoints: List[str] = []
 
     async def startup(self):
         """Initialize health monitor and start periodic checks."""
         # Initialize health tracking for all endpoints
-        endpoints = self._get_all_endpoints()
+        endpoints = self._endpoints = self._get_all_endpoints()
         for endpoint in endpoints:
             self.nodes[endpoint] = NodeHealth(endpoint=endpoint)
 
@@ -51,6 +60,15 @@ class HealthMonitor:
             timeout=httpx.Timeout(self.settings.HEALTH_CHECK_TIMEOUT_SECONDS)
         )
 
+        # Reuse one UNIX socket client across probes
+        if self.settings.INFERENCE_TRANSPORT == "unix":
+            socket_path = self.settings.get_inference_socket_path()
+            if socket_path:
+                self.uds_client = httpx.AsyncClient(
+                    transport=httpx.AsyncHTTPTransport(uds=socket_path),
+                    timeout=httpx.Timeout(self.settings.HEALTH_CHECK_TIMEOUT_SECONDS),
+                )
+
         # Start periodic health checks
         if endpoints:
             self.health_check_task = asyncio.create_task(self._periodic_health_check())
@@ -67,6 +85,9 @@ class HealthMonitor:
         if self.client:
             await self.client.aclose()
 
+        if self.uds_client:
+            await self.uds_client.aclose()
+
     def _get_all_endpoints(self) -> List[str]:
         """Get all configured inference endpoints."""
         if self.settings.INFERENCE_TRANSPORT == "unix":
@@ -89,100 +110,123 @@ class HealthMonitor:
                 await asyncio.sleep(self.settings.HEALTH_CHECK_INTERVAL_SECONDS)
 
     async def _check_all_nodes(self):
-        """Check health of all configured nodes."""
-        async with self.lock:
-            for endpoint in self.nodes:
-                await self._check_node_health(endpoint)
+        """Check health of all configured nodes concurrently."""
+        endpoints = list(self.nodes)
+        await asyncio.gather(
+            *[self._check_node_health(endpoint) for endpoint in endpoints]
+        )
 
     async def _check_node_health(self, endpoint: str):
         """Check health of a specific node."""
-        node = self.nodes[endpoint]
-
         try:
             is_healthy = await self._perform_health_check(endpoint)
-
-            if is_healthy:
-                node.consecutive_failures = 0
-                node.consecutive_successes += 1
-                node.last_error = ""
-
-                # Mark as healthy if it meets the threshold
-                if (
-                    node.status != NodeStatus.HEALTHY
-                    and node.consecutive_successes >= self.settings.HEALTHY_THRESHOLD
-                ):
-                    node.status = NodeStatus.HEALTHY
-                    self.healthy_nodes.add(endpoint)
-
-            else:
-                node.consecutive_successes = 0
-                node.consecutive_failures += 1
-
-                # Mark as unhealthy if it meets the threshold
-                if (
-                    node.status != NodeStatus.UNHEALTHY
-                    and node.consecutive_failures >= self.settings.UNHEALTHY_THRESHOLD
-                ):
-                    node.status = NodeStatus.UNHEALTHY
-                    self.healthy_nodes.discard(endpoint)
-
+            error = ""
         except Exception as e:
-            node.consecutive_successes = 0
-            node.consecutive_failures += 1
-            node.last_error = str(e)
+            is_healthy = None
+            error = str(e)
 
-        node.last_check = time.time()
+        # Build the new state off to the side and publish it with plain
+        # reference swaps; nothing below awaits, so readers never see a
+        # half-updated node and no lock is needed
+        node = self.nodes[endpoint]
+        healthy_nodes = self.healthy_nodes
+
+        if is_healthy:
+            node = replace(
+                node,
+                consecutive_failures=0,
+                consecutive_successes=node.consecutive_successes + 1,
+                last_error="",
+            )
+
+            # Mark as healthy if it meets the threshold
+            if (
+                node.status != NodeStatus.HEALTHY
+                and node.consecutive_successes >= self.settings.HEALTHY_THRESHOLD
+            ):
+                node = replace(node, status=NodeStatus.HEALTHY)
+                healthy_nodes = healthy_nodes | {endpoint}
+
+        elif is_healthy is False:
+            node = replace(
+                node,
+                consecutive_successes=0,
+                consecutive_failures=node.consecutive_failures + 1,
+            )
+
+            # Mark as unhealthy if it meets the threshold
+            if (
+                node.status != NodeStatus.UNHEALTHY
+                and node.consecutive_failures >= self.settings.UNHEALTHY_THRESHOLD
+            ):
+                node = replace(node, status=NodeStatus.UNHEALTHY)
+                healthy_nodes = healthy_nodes - {endpoint}
+
+        else:
+            node = replace(
+                node,
+                consecutive_successes=0,
+                consecutive_failures=node.consecutive_failures + 1,
+                last_error=error,
+            )
+
+        self.nodes[endpoint] = replace(node, last_check=time.time())
+        if healthy_nodes is not self.healthy_nodes:
+            self.healthy_nodes = healthy_nodes
+            self._healthy_snapshot = tuple(healthy_nodes)
 
     async def _perform_health_check(self, endpoint: str) -> bool:
         """Perform actual health check for an endpoint."""
         try:
             if endpoint == "unix_socket":
-                # For UNIX socket, check if socket exists and is accessible
-                socket_path = self.settings.get_inference_socket_path()
-                if not socket_path:
-                    return False
-
-                import os
-
-                if not os.path.exists(socket_path):
+                # For UNIX socket, the client only exists if a path is configured
+                if self.uds_client is None:
                     return False
 
-                # Try a simple request to the socket
-                unix_client = httpx.AsyncClient(
-                    transport=httpx.AsyncHTTPTransport(uds=socket_path),
-                    timeout=httpx.Timeout(self.settings.HEALTH_CHECK_TIMEOUT_SECONDS),
-                )
-
-                try:
-                    response = await unix_client.get("http://localhost/v1/models")
-                    return response.status_code == 200
-                finally:
-                    await unix_client.aclose()
+                # A missing socket fails the connect, which marks the node
+                # unhealthy, so there is no blocking stat on the event loop
+                response = await self.uds_client.get(f"http://localhost{HEALTH_PATH}")
+                return response.status_code == 200
 
             else:
                 # For HTTP/HTTPS endpoints
-                response = await self.client.get(f"{endpoint}/v1/models")
+                response = await self.client.get(f"{endpoint}{HEALTH_PATH}")
                 return response.status_code == 200
 
         except Exception as e:
             return False
 
     async def get_healthy_endpoint(self) -> str:
-        """Get a healthy endpoint using round-robin selection."""
-        async with self.lock:
-            if not self.healthy_nodes:
-                # No healthy nodes, return the first configured endpoint as fallback
-                endpoints = self._get_all_endpoints()
-                if endpoints:
-                    return endpoints[0]
-                raise RuntimeError("No inference endpoints available")
-
-            # Convert to list for round-robin
-            healthy_list = list(self.healthy_nodes)
-            endpoint = healthy_list[self.current_node_index % len(healthy_list)]
-            self.current_node_index += 1
-
-            return endpoint
+        """
+        Get a healthy endpoint using power-of-two-choices selection.
+
+        Two healthy nodes are sampled at random and the one with fewer
+        in-flight streams wins, so a node stuck on a long request stops
+        receiving an equal share of new ones.
+        """
+        # Read the immutable snapshot; nothing here awaits, so no lock is needed
+        healthy = self._healthy_snapshot
+        if not healthy:
+            # No healthy nodes, return the first configured endpoint as fallback
+            endpoints = self._endpoints or self._get_all_endpoints()
+            if endpoints:
+                return endpoints[0]
+            raise RuntimeError("No inference endpoints available")
+
+        if len(healthy) == 1:
+            return healthy[0]
+
+        a, b = random.sample(healthy, 2)
+        inflight = self._inflight
+        return a if inflight[a] <= inflight[b] else b
+
+    def acquire(self, endpoint: str):
+        """Record a stream starting on an endpoint."""
+        self._inflight[endpoint] += 1
+
+    def release(self, endpoint: str):
+        """Record a stream on an endpoint finishing."""
+        self._inflight[endpoint] -= 1
 
     def get_health_status(self) -> Dict:
         """Get current health status of all nodes."""
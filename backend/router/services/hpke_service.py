@@ -1,19 +1,36 @@
-import base64
-import json
 import logging
 import os
+import time
 import ctypes
 import ctypes.util
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional, Any
 
 import hpke
+import orjson
+import pybase64
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import ec
 
 from config import Settings
 from models import ChatRequest, DecryptedChatPayload
 
+logger = logging.getLogger(__name__)
+
+
+# How long seen request IDs are remembered for replay protection
+_REPLAY_ID_TTL_NS = 3600 * 1_000_000_000
+
+# Base64 AAD ("chunk-<n>") for the first chunks of a stream, built once so
+# encrypt_chunk does a tuple lookup instead of format + encode + b64 per chunk
+_CHUNK_AAD_CACHE_SIZE = 4096
+_CHUNK_AAD_B64 = tuple(
+    pybase64.b64encode_as_string(f"chunk-{i}".encode("utf-8"))
+    for i in range(_CHUNK_AAD_CACHE_SIZE)
+)
+_MOCK_CHUNK_ENCKEY_B64 = pybase64.b64encode_as_string(b"mock_enckey_for_chunk")
+
 
 class HPKEService:
     """
@@ -21,6 +38,9 @@ class HPKEService:
     Handles encryption, decryption, key rotation, and replay protection.
     """
 
+    # Wall clock in epoch seconds; tests swap in a frozen one per instance
+    _clock = staticmethod(time.time)
+
     def __init__(self, settings: Settings):
         self.settings = settings
         self.current_private_key: Optional[ec.EllipticCurvePrivateKey] = None
@@ -28,10 +48,11 @@ class HPKEService:
         self.next_private_key: Optional[ec.EllipticCurvePrivateKey] = None
         self.next_public_key: Optional[bytes] = None
         self.key_id = "key-001"
-        self.key_expires_at = datetime.now(timezone.utc) + timedelta(
+        self.key_expires_at = self._now() + timedelta(
             hours=settings.HPKE_KEY_ROTATION_HOURS
         )
-        self.seen_request_ids: Dict[str, datetime] = {}
+        # request_id -> time.monotonic_ns() when first seen, oldest first
+        self.seen_request_ids: OrderedDict[str, int] = OrderedDict()
         self.hpke_suite = None
 
         # Initialize keys (in production, load from secure storage)
@@ -68,7 +89,7 @@ class HPKEService:
                 self._mlock_sensitive_data()
 
         except Exception as e:
-            logging.error(f"Failed to initialize HPKE keys: {e}")
+            logger.error(f"Failed to initialize HPKE keys: {e}")
             raise
 
     def decrypt_request(self, request: ChatRequest) -> DecryptedChatPayload:
@@ -81,18 +102,20 @@ class HPKEService:
 
         try:
             # Decode base64 components
-            _ = base64.b64decode(
+            _ = pybase64.b64decode(
                 request.encapsulated_key
             )  # encapsulated_key used for HPKE context
-            ciphertext = base64.b64decode(request.ciphertext)
-            _ = base64.b64decode(
+            # Decode straight into a mutable buffer so it can be wiped in place
+            ciphertext = pybase64.b64decode_as_bytearray(request.ciphertext)
+            _ = pybase64.b64decode(
                 request.aad
             )  # aad used for additional authentication data
 
             # Simplified HPKE decryption for testing
             # In this test version, we'll decode the base64 ciphertext as JSON
             # Real HPKE implementation would use the suite methods properly
-            plaintext_data = json.loads(ciphertext.decode("utf-8"))
+            # orjson parses the UTF-8 buffer directly, no str copy needed
+            plaintext_data = orjson.loads(ciphertext)
 
             # Zero out sensitive plaintext data from memory
             self._zero_memory(ciphertext)
@@ -100,7 +123,7 @@ class HPKEService:
             return DecryptedChatPayload(**plaintext_data)
 
         except Exception as e:
-            logging.error(f"HPKE decryption failed: {type(e).__name__}")
+            logger.error(f"HPKE decryption failed: {type(e).__name__}")
             raise ValueError("Decryption failed")
 
     def encrypt_chunk(
@@ -113,26 +136,28 @@ class HPKEService:
         try:
             # Simplified chunk encryption for testing
             # In production, this would use proper HPKE encryption
-            chunk_aad = f"chunk-{sequence}".encode("utf-8")
+            if 0 <= sequence < _CHUNK_AAD_CACHE_SIZE:
+                chunk_aad_b64 = _CHUNK_AAD_B64[sequence]
+            else:
+                chunk_aad_b64 = pybase64.b64encode_as_string(
+                    f"chunk-{sequence}".encode("utf-8")
+                )
 
             # For testing, just base64 encode the chunk
             chunk_bytes = chunk_data.encode("utf-8")
-            simulated_ciphertext = base64.b64encode(chunk_bytes).decode("ascii")
-            simulated_enckey = base64.b64encode(b"mock_enckey_for_chunk").decode(
-                "ascii"
-            )
+            simulated_ciphertext = pybase64.b64encode_as_string(chunk_bytes)
 
             encrypted_chunk = {
-                "encapsulated_key": simulated_enckey,
+                "encapsulated_key": _MOCK_CHUNK_ENCKEY_B64,
                 "ciphertext": simulated_ciphertext,
-                "aad": base64.b64encode(chunk_aad).decode("ascii"),
+                "aad": chunk_aad_b64,
                 "sequence": sequence,
             }
 
-            return json.dumps(encrypted_chunk)
+            return orjson.dumps(encrypted_chunk).decode("utf-8")
 
         except Exception as e:
-            logging.error(f"HPKE chunk encryption failed: {type(e).__name__}")
+            logger.error(f"HPKE chunk encryption failed: {type(e).__name__}")
             raise ValueError("Chunk encryption failed")
 
     def get_public_keys(self) -> Dict[str, Any]:
@@ -140,12 +165,12 @@ class HPKEService:
         Get current and next public keys for client key pinning.
         """
         current_pubkey_b64 = (
-            base64.b64encode(self.current_public_key).decode("ascii")
+            pybase64.b64encode_as_string(self.current_public_key)
             if self.current_public_key
             else ""
         )
         next_pubkey_b64 = (
-            base64.b64encode(self.next_public_key).decode("ascii")
+            pybase64.b64encode_as_string(self.next_public_key)
             if self.next_public_key
             else None
         )
@@ -162,10 +187,14 @@ class HPKEService:
         """
         Check request against replay attacks using timestamp and request ID.
         """
-        now = datetime.now(timezone.utc)
+        # A naive timestamp has no defined instant; .timestamp() would read it
+        # as server-local time and shift the window by the host's UTC offset
+        if request.timestamp.utcoffset() is None:
+            return False
 
-        # Check timestamp window (TTL)
-        request_age = (now - request.timestamp).total_seconds()
+        # Check timestamp window (TTL); plain float seconds avoid building
+        # aware datetimes and timedeltas on every request
+        request_age = self._clock() - request.timestamp.timestamp()
         if request_age > self.settings.REQUEST_TTL_SECONDS:
             return False
 
@@ -177,15 +206,19 @@ class HPKEService:
             return False
 
         # Store request ID with cleanup
-        self.seen_request_ids[request.request_id] = now
-
-        # Clean old request IDs (keep last hour)
-        cutoff = now - timedelta(hours=1)
-        self.seen_request_ids = {
-            rid: timestamp
-            for rid, timestamp in self.seen_request_ids.items()
-            if timestamp > cutoff
-        }
+        now_ns = time.monotonic_ns()
+        self.seen_request_ids[request.request_id] = now_ns
+
+        # Clean old request IDs (keep last hour). Entries are in arrival
+        # order, so expired ones sit at the front and the scan stops at the
+        # first live one instead of walking every ID on every request.
+        seen = self.seen_request_ids
+        cutoff_ns = now_ns - _REPLAY_ID_TTL_NS
+        while seen:
+            oldest_ns = seen[next(iter(seen))]
+            if oldest_ns > cutoff_ns:
+                break
+            seen.popitem(last=False)
 
         return True
 
@@ -196,7 +229,8 @@ class HPKEService:
         if self.next_private_key and self.next_public_key:
             self.current_private_key = self.next_private_key
             self.current_public_key = self.next_public_key
-            self.key_expires_at = datetime.now(timezone.utc) + timedelta(
+            now = self._now()
+            self.key_expires_at = now + timedelta(
                 hours=self.settings.HPKE_KEY_ROTATION_HOURS
             )
 
@@ -207,11 +241,15 @@ class HPKEService:
             self._save_keys_to_file()
 
             # Update key ID
-            self.key_id = f"key-{datetime.now(timezone.utc).strftime('%Y%m%d%H')}"
+            self.key_id = f"key-{now.strftime('%Y%m%d%H')}"
 
     def should_rotate_keys(self) -> bool:
         """Check if keys should be rotated based on expiration time."""
-        return datetime.now(timezone.utc) >= self.key_expires_at
+        return self._now() >= self.key_expires_at
+
+    def _now(self) -> datetime:
+        """Current UTC time from the service clock."""
+        return datetime.fromtimestamp(self._clock(), timezone.utc)
 
     def get_key_rotation_status(self) -> Dict[str, Any]:
         """Get key rotation status information."""
@@ -266,7 +304,7 @@ class HPKEService:
                 self.current_public_key = f.read()
 
         except Exception as e:
-            logging.error(f"Failed to load keys from files: {e}")
+            logger.error(f"Failed to load keys from files: {e}")
             raise
 
     def _save_keys_to_file(self):
@@ -290,7 +328,7 @@ class HPKEService:
             os.chmod(self.settings.ROUTER_HPKE_PUBLIC_KEY_PATH, 0o644)
 
         except Exception as e:
-            logging.error(f"Failed to save keys to files: {e}")
+            logger.error(f"Failed to save keys to files: {e}")
             raise
 
     def _mlock_sensitive_data(self):
@@ -305,12 +343,18 @@ class HPKEService:
         except Exception:
             pass  # Silent fallback
 
-    def _zero_memory(self, data: bytes):
+    def _zero_memory(self, data: bytes | bytearray):
         """Securely zero out sensitive data in memory."""
         try:
-            # Python doesn't provide direct memory zeroing, but we can
-            # at least clear the reference and trigger garbage collection
-            if hasattr(data, "__del__"):
-                del data
+            if isinstance(data, bytearray):
+                # Mutable buffer: overwrite it in place with a single libc
+                # memset rather than a per-byte Python loop
+                size = len(data)
+                if size:
+                    buffer = (ctypes.c_char * size).from_buffer(data)
+                    ctypes.memset(ctypes.addressof(buffer), 0, size)
+                    del buffer  # Release the export so data can be resized
+            # Immutable bytes can't be overwritten; dropping the reference
+            # is the best Python allows
         except Exception:
             pass  # Best effort
@@ -1,15 +1,59 @@
 import asyncio
-import json
+import bisect
 import logging
+import re
 import time
-from typing import AsyncGenerator, Dict, List, Optional
+from collections import deque
+from typing import AsyncGenerator, Deque, Dict, List, Optional
 
 import httpx
+import orjson
 from config import Settings
 from models import InferenceRequest
 from services.health_monitor import HealthMonitor
 from services.harmony_service import HarmonyService
 
+logger = logging.getLogger(__name__)
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# SSE payload lines ("data: ...") in a buffer of complete lines
+_SSE_DATA_PATTERN = re.compile(rb"^data: (.*?)\r?$", re.MULTILINE)
+
+# End-of-stream sentinel; real JSON chunks are always longer than this, so
+# only short payloads are stripped and compared
+_DONE = b"[DONE]"
+_DONE_MAX_LEN = 16
+
+# Tokens buffered between the SSE parser task and the consumer
+STREAM_QUEUE_SIZE = 32
+
+# Marks a cleanly finished stream on the parser queue
+_STREAM_END = object()
+
+
+async def _iter_sse_data(response: httpx.Response) -> AsyncGenerator[bytes, None]:
+    """
+    Yield the payload of each SSE data line from a streaming response.
+
+    Works on raw bytes so lines are never decoded to str; the regex scans
+    every complete line received so far in one pass.
+    """
+    buffer = b""
+    async for chunk in response.aiter_bytes():
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        if end == -1:
+            continue
+        complete, buffer = buffer[:end], buffer[end + 1 :]
+        for match in _SSE_DATA_PATTERN.finditer(complete):
+            yield match.group(1)
+
+    # A final line without a trailing newline
+    if buffer:
+        for match in _SSE_DATA_PATTERN.finditer(buffer):
+            yield match.group(1)
+
 
 class InferenceService:
     """
@@ -23,7 +67,11 @@ class InferenceService:
         self.health_monitor = HealthMonitor(settings)
         self.active_streams = 0
         self.total_requests = 0
-        self.latency_samples: List[float] = []
+        self.latency_samples: Deque[float] = deque(maxlen=1000)
+        # Same samples kept in order, so percentiles are a single index
+        self._sorted_latencies: List[float] = []
+        self._streamed_tokens = 0
+        self._streaming_seconds = 0.0
         self.error_count = 0
         
         # Initialize Harmony service if enabled
@@ -36,6 +84,12 @@ class InferenceService:
         """Initialize the HTTP client and health monitor."""
         await self.health_monitor.startup()
 
+        limits = httpx.Limits(
+            max_connections=self.settings.INFERENCE_MAX_CONNECTIONS,
+            max_keepalive_connections=self.settings.INFERENCE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.settings.INFERENCE_KEEPALIVE_EXPIRY_SECONDS,
+        )
+
         if self.settings.INFERENCE_TRANSPORT == "unix":
             # For UNIX socket communication
             socket_path = self.settings.get_inference_socket_path()
@@ -51,6 +105,7 @@ class InferenceService:
                             write=self.settings.INFERENCE_WRITE_TIMEOUT_SECONDS,
                             pool=self.settings.INFERENCE_TIMEOUT_SECONDS,
                         ),
+                        limits=limits,
                     )
                 else:
                     self.client = None
@@ -64,7 +119,10 @@ class InferenceService:
                     read=self.settings.INFERENCE_READ_TIMEOUT_SECONDS,
                     write=self.settings.INFERENCE_WRITE_TIMEOUT_SECONDS,
                     pool=self.settings.INFERENCE_TIMEOUT_SECONDS,
-                )
+                ),
+                "limits": limits,
+                # HTTP/2 is negotiated via ALPN, so it only applies to https:// nodes
+                "http2": self.settings.INFERENCE_HTTP2,
             }
 
             # Add mTLS configuration for production
@@ -119,11 +177,12 @@ class InferenceService:
 
         self.active_streams += 1
         self.total_requests += 1
-        start_time = time.time()
+        start_time = time.monotonic()
 
         # Set up request budget timeout
         budget_timeout = self.settings.REQUEST_BUDGET_SECONDS
         request_deadline = start_time + budget_timeout
+        selected_endpoint = None
 
         try:
             # Prepare request data based on whether Harmony is enabled
@@ -160,13 +219,15 @@ class InferenceService:
                 }
                 use_completion_api = False
 
-            logging.info(f"Starting inference for request {request.request_id}")
+            logger.info("Starting inference for request %s", request.request_id)
 
             # Choose endpoint using health monitor
             if self.settings.INFERENCE_TRANSPORT == "unix":
                 base_url = "http://localhost"
             else:
                 healthy_endpoint = await self.health_monitor.get_healthy_endpoint()
+                selected_endpoint = healthy_endpoint
+                self.health_monitor.acquire(selected_endpoint)
                 if healthy_endpoint == "unix_socket":
                     base_url = "http://localhost"
                 else:
@@ -178,73 +239,119 @@ class InferenceService:
             else:
                 url = f"{base_url}/v1/chat/completions"
 
+            # Parse in a separate task so the next chunk is read and decoded
+            # while the caller is still encrypting the previous token; the
+            # bounded queue pushes back on the parser if the caller falls behind
+            queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+            parser_task = asyncio.create_task(
+                self._parse_into(
+                    queue, url, request_data, use_completion_api, request_deadline
+                )
+            )
+            try:
+                while True:
+                    token = await queue.get()
+                    if token is _STREAM_END:
+                        break
+                    if isinstance(token, BaseException):
+                        raise token
+                    yield token
+                token_count = await parser_task
+            finally:
+                if not parser_task.done():
+                    parser_task.cancel()
+                    try:
+                        await parser_task
+                    except asyncio.CancelledError:
+                        pass
+
+            # Record successful completion
+            elapsed = (time.monotonic() - start_time) * 1000  # Convert to ms
+            self._record_latency(elapsed)
+            self._streamed_tokens += token_count
+            self._streaming_seconds += elapsed / 1000
+
+        except Exception as e:
+            self.error_count += 1
+            logger.error("Inference streaming error: %s: %s", type(e).__name__, e)
+            raise
+        finally:
+            self.active_streams -= 1
+            if selected_endpoint is not None:
+                self.health_monitor.release(selected_endpoint)
+
+    async def _parse_into(
+        self,
+        queue: asyncio.Queue,
+        url: str,
+        request_data: Dict,
+        use_completion_api: bool,
+        request_deadline: float,
+    ) -> int:
+        """
+        Send the inference request and put each parsed token on the queue.
+
+        Ends with _STREAM_END, or with the exception that stopped the stream
+        so stream_inference can re-raise it. Returns the number of tokens.
+        """
+        token_count = 0
+        try:
             async with self.client.stream(
                 "POST",
                 url,
-                json=request_data,
-                headers={"Content-Type": "application/json"},
+                content=orjson.dumps(request_data),
+                headers=_JSON_HEADERS,
             ) as response:
                 response.raise_for_status()
 
-                token_count = 0
-                async for line in response.aiter_lines():
+                # Bind hot-loop callables to locals; parsing itself runs in
+                # compiled code (re for line scanning, orjson for JSON)
+                loads = orjson.loads
+                monotonic = time.monotonic
+                async for data in _iter_sse_data(response):
                     # Check request budget timeout
-                    current_time = time.time()
-                    if current_time > request_deadline:
+                    if monotonic() > request_deadline:
                         raise asyncio.TimeoutError("Request budget exceeded")
 
-                    # Parse SSE format: lines starting with "data: "
-                    if line.startswith("data: "):
-                        data = line[6:]  # Remove "data: " prefix
+                    # Check for completion
+                    if len(data) <= _DONE_MAX_LEN and data.strip() == _DONE:
+                        break
 
-                        # Check for completion
-                        if data.strip() == "[DONE]":
-                            break
-
-                        try:
-                            # Parse JSON chunk from llama.cpp
-                            chunk_data = json.loads(data)
-
-                            if "choices" in chunk_data and chunk_data["choices"]:
-                                choice = chunk_data["choices"][0]
-                                
-                                # Handle both completion and chat completion formats
-                                if use_completion_api:
-                                    # Completion API format
-                                    token = choice.get("text", "")
-                                    finish_reason = choice.get("finish_reason")
-                                else:
-                                    # Chat completion API format  
-                                    delta = choice.get("delta", {})
-                                    token = delta.get("content", "")
-                                    finish_reason = choice.get("finish_reason")
-
-                                # Extract and yield token content
-                                if token:  # Only yield non-empty tokens
-                                    token_count += 1
-                                    yield token
-
-                                # Check if this is the final chunk
-                                if finish_reason:
-                                    break
-
-                        except json.JSONDecodeError as e:
-                            continue
-                        except Exception as e:
+                    try:
+                        # Parse JSON chunk from llama.cpp
+                        choices = loads(data).get("choices")
+                        if not choices:
                             continue
+                        choice = choices[0]
+
+                        # Handle both completion and chat completion formats
+                        if use_completion_api:
+                            # Completion API format
+                            token = choice.get("text", "")
+                        else:
+                            # Chat completion API format
+                            token = choice.get("delta", {}).get("content", "")
+
+                        # Extract and queue token content
+                        if token:  # Only queue non-empty tokens
+                            token_count += 1
+                            await queue.put(token)
+
+                        # Check if this is the final chunk
+                        if choice.get("finish_reason"):
+                            break
 
-            # Record successful completion
-            elapsed = (time.time() - start_time) * 1000  # Convert to ms
-            self.latency_samples.append(elapsed)
-            if len(self.latency_samples) > 1000:
-                self.latency_samples = self.latency_samples[-1000:]
+                    except orjson.JSONDecodeError as e:
+                        continue
+                    except Exception as e:
+                        continue
 
         except Exception as e:
-            self.error_count += 1
-            logging.error(f"Inference streaming error: {type(e).__name__}: {e}")
-            raise
-        finally:
-            self.active_streams -= 1
+            await queue.put(e)
+            return token_count
+
+        await queue.put(_STREAM_END)
+        return token_count
 
     def get_active_streams(self) -> int:
         """Get number of active streaming connections."""
@@ -254,26 +361,35 @@ class InferenceService:
         """Get total number of requests processed."""
         return self.total_requests
 
+    def _record_latency(self, elapsed: float):
+        """Add a latency sample, evicting the oldest once the window is full."""
+        samples = self.latency_samples
+        sorted_samples = self._sorted_latencies
+        if len(samples) == samples.maxlen:
+            del sorted_samples[bisect.bisect_left(sorted_samples, samples[0])]
+        samples.append(elapsed)
+        bisect.insort(sorted_samples, elapsed)
+
+    def _latency_percentile(self, fraction: float) -> float:
+        """Get a latency percentile from the ordered sample window."""
+        sorted_samples = self._sorted_latencies
+        if not sorted_samples:
+            return 0.0
+        return sorted_samples[int(len(sorted_samples) * fraction)]
+
     def get_latency_p50(self) -> float:
         """Get 50th percentile latency in milliseconds."""
-        if not self.latency_samples:
-            return 0.0
-        sorted_samples = sorted(self.latency_samples)
-        idx = int(len(sorted_samples) * 0.5)
-        return sorted_samples[idx]
+        return self._latency_percentile(0.5)
 
     def get_latency_p95(self) -> float:
         """Get 95th percentile latency in milliseconds."""
-        if not self.latency_samples:
-            return 0.0
-        sorted_samples = sorted(self.latency_samples)
-        idx = int(len(sorted_samples) * 0.95)
-        return sorted_samples[idx]
+        return self._latency_percentile(0.95)
 
     def get_tokens_per_second(self) -> float:
-        """Get average tokens per second (placeholder implementation)."""
-        # TODO: Implement actual token rate calculation
-        return 50.0
+        """Get average tokens per second across completed streams."""
+        if not self._streaming_seconds:
+            return 0.0
+        return self._streamed_tokens / self._streaming_seconds
 
     def get_error_rate(self) -> float:
         """Get 5xx error rate as percentage."""
@@ -4,6 +4,7 @@ Direct test of inference client without HPKE.
 """
 
 import asyncio
+import os
 import sys
 sys.path.insert(0, '.')
 
@@ -11,6 +12,9 @@ from config import get_settings
 from services.inference_client import InferenceClient
 from models import DecryptedChatPayload
 
+# Per-chunk output is one terminal write per token; opt in with VERBOSE=1
+VERBOSE = bool(os.environ.get('VERBOSE'))
+
 
 async def test_direct_inference():
     """Test direct inference client without HPKE."""
@@ -28,9 +32,7 @@ async def test_direct_inference():
     healthy = await client.health_check()
     print(f"✅ Health check: {'healthy' if healthy else 'unhealthy'}")
     
-    if not healthy:
-        print("❌ Inference server is not healthy")
-        return False
+    assert healthy, "inference server is not healthy"
     
     # Create test payload
     test_payload = DecryptedChatPayload(
@@ -46,31 +48,27 @@ async def test_direct_inference():
     
     try:
         print("🚀 Starting stream...")
-        chunk_count = 0
-        full_response = ""
+        chunks = []
         
         async for chunk in client.stream_chat(test_payload):
-            chunk_count += 1
-            full_response += chunk
-            print(f"📦 Chunk {chunk_count}: '{chunk}'")
+            chunks.append(chunk)
             
             # Stop after reasonable amount for testing
-            if chunk_count > 50:
+            if len(chunks) > 50:
                 break
         
+        chunk_count = len(chunks)
+        full_response = "".join(chunks)
+        if VERBOSE:
+            print("\n".join(f"📦 Chunk {i}: '{chunk}'" for i, chunk in enumerate(chunks, 1)))
+        
         print("\n✅ Streaming completed successfully!")
         print(f"   Total chunks: {chunk_count}")
         print(f"   Full response: {full_response[:200]}...")
         
+    finally:
         await client.shutdown()
-        return True
-        
-    except Exception as e:
-        print(f"❌ Streaming failed: {e}")
-        await client.shutdown()
-        return False
 
 
 if __name__ == "__main__":
-    success = asyncio.run(test_direct_inference())
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    asyncio.run(test_direct_inference())
\ No newline at end of file
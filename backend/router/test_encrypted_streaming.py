@@ -6,166 +6,174 @@ Tests the updated /api/chat endpoint using the new inference service.
 
 import asyncio
 import httpx
-import json
+import orjson
 import time
 import base64
-from datetime import datetime
+import itertools
+from datetime import datetime, timezone
 
 # Base URL for the router
 BASE_URL = "http://localhost:8000"
 
+# Mock HPKE fields are constant, so encode them once; only timestamp and
+# request_id change per request
+_ENC_KEY = "bW9ja19lbmNhcHN1bGF0ZWRfa2V5XzMyYnl0ZXNfX18="  # b"mock_encapsulated_key_32bytes___"
+_AAD = "dGVzdF9hYWQ="  # b"test_aad"
+_DEV_PK = "bW9ja19kZXZpY2VfcHVia2V5XzMyYnl0ZXNfX19f"  # b"mock_device_pubkey_32bytes____"
+_PAYLOAD_B64 = base64.b64encode(orjson.dumps({
+    "messages": [
+        {"role": "user", "content": "Count from 1 to 3"}
+    ],
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "max_tokens": 50
+})).decode('ascii')
 
-async def test_encrypted_streaming():
+_BASE_REQUEST = {
+    "encapsulated_key": _ENC_KEY,
+    "ciphertext": _PAYLOAD_B64,
+    "aad": _AAD,
+    "device_pubkey": _DEV_PK,
+}
+
+# The router rejects replayed request IDs, so prefix the per-run counter with
+# the start time; one timestamp per run stays well inside the replay TTL
+_RUN_ID = time.time_ns()
+_REQUEST_IDS = itertools.count()
+_TIMESTAMP = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+async def _iter_lines(response: httpx.Response):
+    """Yield decoded SSE lines, splitting whole network reads instead of reading per line."""
+    buffer = b""
+    # No chunk_size: httpx would hold data back until a full chunk arrived
+    async for data in response.aiter_bytes():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8")
+    if buffer:
+        yield buffer.rstrip(b"\r").decode("utf-8")
+
+
+async def test_encrypted_streaming(client: httpx.AsyncClient):
     """Test the /api/chat endpoint with HPKE encryption and new inference service."""
     print("=== Testing Encrypted Streaming (Step 9) ===")
     
     # Create a mock HPKE encrypted request (simplified for testing)
     # In production, this would be properly encrypted by the mobile client
-    mock_encrypted_request = {
-        "encapsulated_key": base64.b64encode(b"mock_encapsulated_key_32bytes___").decode('ascii'),
-        "ciphertext": base64.b64encode(json.dumps({
-            "messages": [
-                {"role": "user", "content": "Count from 1 to 3"}
-            ],
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "max_tokens": 50
-        }).encode('utf-8')).decode('ascii'),
-        "aad": base64.b64encode(b"test_aad").decode('ascii'),
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "request_id": f"encrypted-test-{datetime.now().isoformat()}",
-        "device_pubkey": base64.b64encode(b"mock_device_pubkey_32bytes____").decode('ascii')
-    }
+    mock_encrypted_request = _BASE_REQUEST.copy()
+    mock_encrypted_request["timestamp"] = _TIMESTAMP
+    mock_encrypted_request["request_id"] = f"encrypted-test-{_RUN_ID}-{next(_REQUEST_IDS)}"
     
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            print("Sending HPKE encrypted request to /api/chat")
-            print(f"Request ID: {mock_encrypted_request['request_id']}")
+    print("Sending HPKE encrypted request to /api/chat")
+    print(f"Request ID: {mock_encrypted_request['request_id']}")
+    
+    async with client.stream(
+        "POST", 
+        "/api/chat",
+        content=orjson.dumps(mock_encrypted_request),
+        headers={"Accept": "text/event-stream", "Content-Type": "application/json"}
+    ) as response:
+        
+        if response.status_code != 200:
+            print(f"Error: Status {response.status_code}")
+            error_text = await response.aread()
+            raise AssertionError(f"chat request failed: {error_text}")
+        
+        print(f"Response Status: {response.status_code}")
+        print("Streaming encrypted chunks:")
+        print("-" * 50)
+        
+        chunk_count = 0
+        start_time = time.time()
+        
+        async for line in _iter_lines(response):
+            # One split per line instead of a startswith check per field
+            key, sep, value = line.partition(": ")
+            if not sep:
+                continue
             
-            async with client.stream(
-                "POST", 
-                f"{BASE_URL}/api/chat",
-                json=mock_encrypted_request,
-                headers={"Accept": "text/event-stream"}
-            ) as response:
-                
-                if response.status_code != 200:
-                    print(f"Error: Status {response.status_code}")
-                    error_text = await response.aread()
-                    print(f"Error response: {error_text}")
-                    return False
-                
-                print(f"Response Status: {response.status_code}")
-                print("Streaming encrypted chunks:")
-                print("-" * 50)
+            if key == "data":
+                data = value
                 
-                chunk_count = 0
-                start_time = time.time()
+                if not data.strip():
+                    continue
                 
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        data = line[6:]  # Remove "data: " prefix
-                        
-                        if not data.strip():
-                            continue
-                        
-                        try:
-                            # The data should be a JSON string with encrypted chunk
-                            if data and data != '':
-                                chunk_count += 1
-                                print(f"Encrypted chunk {chunk_count}: {data[:100]}...")
-                                
-                                # Try to parse as JSON to verify structure
-                                try:
-                                    chunk_data = json.loads(data)
-                                    if isinstance(chunk_data, dict):
-                                        print(f"  - Structure: {list(chunk_data.keys())}")
-                                        if "sequence" in chunk_data:
-                                            print(f"  - Sequence: {chunk_data['sequence']}")
-                                except:
-                                    pass  # Not JSON, that's ok for simple encrypted data
-                                    
-                        except Exception as e:
-                            print(f"Parse error: {e}")
-                    
-                    elif line.startswith("event: "):
-                        event_type = line[7:]  # Remove "event: " prefix
-                        print(f"Event: {event_type}")
+                try:
+                    # The data should be a JSON string with encrypted chunk
+                    if data and data != '':
+                        chunk_count += 1
+                        print(f"Encrypted chunk {chunk_count}: {data[:100]}...")
                         
-                        if event_type == "end":
-                            print("Stream completed successfully")
-                            break
-                        elif event_type == "error":
-                            print("Stream error received")
-                            break
-                
-                elapsed = time.time() - start_time
-                print("-" * 50)
-                print(f"Received {chunk_count} encrypted chunks in {elapsed:.2f}s")
-                
-                if chunk_count > 0:
-                    print("✅ Per-chunk HPKE encryption working")
-                    print("✅ Router parsing SSE from llama.cpp")
-                    print("✅ Router re-framing with encryption")
-                    return True
-                else:
-                    print("❌ No chunks received")
-                    return False
+                        # Only JSON objects are worth parsing; anything else is
+                        # simple encrypted data, so skip the failing parse
+                        if data[:1] == '{':
+                            try:
+                                chunk_data = orjson.loads(data)
+                                print(f"  - Structure: {list(chunk_data.keys())}")
+                                if "sequence" in chunk_data:
+                                    print(f"  - Sequence: {chunk_data['sequence']}")
+                            except ValueError:
+                                pass  # Malformed JSON, that's ok for simple encrypted data
+                            
+                except Exception as e:
+                    print(f"Parse error: {e}")
+            
+            elif key == "event":
+                event_type = value
+                print(f"Event: {event_type}")
                 
-    except Exception as e:
-        print(f"Encrypted streaming test error: {e}")
-        return False
+                if event_type == "end":
+                    print("Stream completed successfully")
+                    break
+                elif event_type == "error":
+                    print("Stream error received")
+                    break
+        
+        elapsed = time.time() - start_time
+        print("-" * 50)
+        print(f"Received {chunk_count} encrypted chunks in {elapsed:.2f}s")
+        
+        assert chunk_count > 0, "no chunks received"
+        print("✅ Per-chunk HPKE encryption working")
+        print("✅ Router parsing SSE from llama.cpp")
+        print("✅ Router re-framing with encryption")
+        
 
 
-async def test_hpke_pubkey():
+async def test_hpke_pubkey(client: httpx.AsyncClient):
     """Test HPKE public key endpoint."""
     print("\n=== Testing HPKE Public Keys ===")
     
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BASE_URL}/api/pubkey")
-            
-            if response.status_code != 200:
-                print(f"Error: Status {response.status_code}")
-                return False
-            
-            data = response.json()
-            print(f"Current key ID: {data.get('key_id', 'unknown')}")
-            print(f"Key expires at: {data.get('expires_at', 'unknown')}")
-            print(f"Has next key: {'next_pubkey' in data}")
-            
-            return True
-            
-    except Exception as e:
-        print(f"HPKE pubkey test error: {e}")
-        return False
+    response = await client.get("/api/pubkey")
+    assert response.status_code == 200, f"pubkey status {response.status_code}"
+    
+    data = response.json()
+    print(f"Current key ID: {data.get('key_id', 'unknown')}")
+    print(f"Key expires at: {data.get('expires_at', 'unknown')}")
+    print(f"Has next key: {'next_pubkey' in data}")
 
 
 async def main():
     """Run encrypted streaming tests."""
     print("Starting encrypted streaming tests for Step 9...")
     
-    # Test HPKE keys availability
-    keys_ok = await test_hpke_pubkey()
-    if not keys_ok:
-        print("❌ HPKE keys not available")
-        return
+    # One client for both tests so the connection to the router stays warm
+    async with httpx.AsyncClient(timeout=30.0, base_url=BASE_URL) as client:
+        # Test HPKE keys availability, then encrypted streaming; either
+        # raises AssertionError on failure
+        await test_hpke_pubkey(client)
+        await test_encrypted_streaming(client)
     
-    # Test encrypted streaming
-    streaming_ok = await test_encrypted_streaming()
-    
-    if streaming_ok:
-        print("\n" + "="*60)
-        print("✅ Step 9 Implementation Successfully Tested!")
-        print("✅ Key features working:")
-        print("  ✓ SSE parsing from llama.cpp")
-        print("  ✓ Router token re-framing")
-        print("  ✓ Per-chunk HPKE encryption")
-        print("  ✓ Parameter guardrails")
-        print("  ✓ Protocol stability (router ↔ client)")
-    else:
-        print("❌ Encrypted streaming test failed")
-
+    print("\n" + "="*60)
+    print("✅ Step 9 Implementation Successfully Tested!")
+    print("✅ Key features working:")
+    print("  ✓ SSE parsing from llama.cpp")
+    print("  ✓ Router token re-framing")
+    print("  ✓ Per-chunk HPKE encryption")
+    print("  ✓ Parameter guardrails")
+    print("  ✓ Protocol stability (router ↔ client)")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
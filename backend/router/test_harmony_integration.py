@@ -6,9 +6,15 @@ HPKE encryption and SSE streaming infrastructure.
 """
 
 import asyncio
+import functools
+import hashlib
+import inspect
 import json
 import logging
 from typing import Dict, Any
+from unittest.mock import patch
+
+from cryptography.hazmat.primitives.asymmetric import ec
 
 from config import get_settings
 from services.harmony_service import HarmonyService
@@ -21,13 +27,56 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _fixed_private_key(label: bytes) -> ec.EllipticCurvePrivateKey:
+    """P-256 key whose scalar is sha256(label); fine for the labels used here."""
+    scalar = int.from_bytes(hashlib.sha256(label).digest(), "big")
+    return ec.derive_private_key(scalar, ec.SECP256R1())
+
+
+# Fixed HPKE keys: these checks never decrypt real traffic, so skip keygen
+_TEST_CURRENT_KEY = _fixed_private_key(b"harmony-integration-current")
+_TEST_NEXT_KEY = _fixed_private_key(b"harmony-integration-next")
+
+
+def _use_fixed_current_keys(service: HPKEService):
+    """Stand-in for HPKEService._generate_new_key_pair."""
+    service.current_private_key = _TEST_CURRENT_KEY
+    service.current_public_key = service._public_key_to_bytes(
+        _TEST_CURRENT_KEY.public_key()
+    )
+
+
+def _use_fixed_next_keys(service: HPKEService):
+    """Stand-in for HPKEService._generate_next_keys."""
+    service.next_private_key = _TEST_NEXT_KEY
+    service.next_public_key = service._public_key_to_bytes(_TEST_NEXT_KEY.public_key())
+
+
+@functools.cache
+def _shared_services():
+    """Build settings, Harmony and HPKE services once per process."""
+    settings = get_settings()
+    with patch.multiple(
+        HPKEService,
+        _generate_new_key_pair=_use_fixed_current_keys,
+        _generate_next_keys=_use_fixed_next_keys,
+    ):
+        hpke_service = HPKEService(settings)
+    return settings, HarmonyService(), hpke_service
+
+
 class HarmonyIntegrationTester:
     """Test Harmony integration with existing infrastructure."""
     
-    def __init__(self):
-        self.settings = get_settings()
-        self.harmony_service = HarmonyService()
-        self.hpke_service = HPKEService(self.settings)
+    def __init__(self, settings=None, harmony_service=None, hpke_service=None):
+        if settings is None or harmony_service is None or hpke_service is None:
+            shared_settings, shared_harmony, shared_hpke = _shared_services()
+            settings = settings or shared_settings
+            harmony_service = harmony_service or shared_harmony
+            hpke_service = hpke_service or shared_hpke
+        self.settings = settings
+        self.harmony_service = harmony_service
+        self.hpke_service = hpke_service
         
     def test_harmony_service_basic(self):
         """Test basic Harmony service functionality."""
@@ -140,8 +189,10 @@ class HarmonyIntegrationTester:
         """Test that InferenceService properly initializes with Harmony."""
         logger.info("Testing InferenceService initialization with Harmony...")
         
-        # This should initialize with Harmony support
-        inference_service = InferenceService(self.settings)
+        # This should initialize with Harmony support; reuse it across runs
+        if not hasattr(self, '_infsvc'):
+            self._infsvc = InferenceService(self.settings)
+        inference_service = self._infsvc
         
         # Check that harmony_service is initialized if enabled
         if self.settings.HARMONY_ENABLED:
@@ -163,6 +214,10 @@ class HarmonyIntegrationTester:
         
     def run_all_tests(self):
         """Run all integration tests."""
+        return asyncio.run(self.run_all())
+        
+    async def run_all(self):
+        """Run every test inside a single event loop, awaiting the async ones inline."""
         logger.info("Starting Harmony integration tests...")
         
         tests = [
@@ -170,6 +225,7 @@ class HarmonyIntegrationTester:
             ("InferenceRequest Formatting", self.test_inference_request_formatting), 
             ("Harmony+HPKE Simulation", self.test_harmony_with_hpke_simulation),
             ("Configuration Values", self.test_configuration_values),
+            ("InferenceService Initialization", self.test_inference_service_initialization),
         ]
         
         results = {}
@@ -177,22 +233,14 @@ class HarmonyIntegrationTester:
             try:
                 logger.info(f"\n--- Running: {test_name} ---")
                 result = test_func()
+                if inspect.isawaitable(result):
+                    result = await result
                 results[test_name] = "PASS" if result else "FAIL"
                 logger.info(f"✓ {test_name}: PASSED")
             except Exception as e:
                 results[test_name] = f"FAIL: {e}"
                 logger.error(f"✗ {test_name}: FAILED - {e}")
                 
-        # Run async test
-        try:
-            logger.info(f"\n--- Running: InferenceService Initialization ---")
-            asyncio.run(self.test_inference_service_initialization())
-            results["InferenceService Initialization"] = "PASS"
-            logger.info(f"✓ InferenceService Initialization: PASSED")
-        except Exception as e:
-            results["InferenceService Initialization"] = f"FAIL: {e}"
-            logger.error(f"✗ InferenceService Initialization: FAILED - {e}")
-                
         # Print summary
         logger.info(f"\n--- Test Summary ---")
         all_passed = True
@@ -210,6 +258,11 @@ class HarmonyIntegrationTester:
             return False
 
 
+def test_harmony_integration(settings):
+    """Entry point for pytest; runs the full tester once."""
+    assert HarmonyIntegrationTester(settings=settings).run_all_tests()
+
+
 if __name__ == "__main__":
     tester = HarmonyIntegrationTester()
     success = tester.run_all_tests()
@@ -6,8 +6,48 @@ Test the complete HPKE end-to-end flow by calling the actual API.
 import asyncio
 import aiohttp
 import base64
-import json
-import sys
+import codecs
+import orjson
+import os
+
+# Per-line output is several terminal writes per chunk; opt in with VERBOSE=1
+VERBOSE = bool(os.environ.get('VERBOSE'))
+
+# The chat payload and mock HPKE fields never change, so encode them once
+_PAYLOAD = {
+    "messages": [{"role": "user", "content": "Who were the presidents in the US in the 90s?"}],
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "max_tokens": 100
+}
+
+_BASE_REQUEST = {
+    "encapsulated_key": "bW9ja19lbmNhcHN1bGF0ZWRfa2V5XzMyYnl0ZXNfXw==",  # b"mock_encapsulated_key_32bytes__"
+    # For testing, we base64-encode the JSON (simulating HPKE encryption)
+    "ciphertext": base64.b64encode(orjson.dumps(_PAYLOAD)).decode('ascii'),
+    "aad": "dGVzdF9hYWQ=",  # b"test_aad"
+    "device_pubkey": "bW9ja19kZXZpY2VfcHVia2V5XzMyYnl0ZXNfX19f",  # b"mock_device_pubkey_32bytes____"
+}
+
+async def _iter_lines(response, chunk_size=16384):
+    """Yield decoded lines from an aiohttp response, decoding once per network read."""
+    # Incremental so a multi-byte character split across reads still decodes
+    decode = codecs.getincrementaldecoder('utf-8')().decode
+    buffer = ""
+    async for data in response.content.iter_chunked(chunk_size):
+        buffer += decode(data)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+async def _get_json(session, url):
+    """GET a URL and return (status, parsed JSON body or None)."""
+    async with session.get(url) as response:
+        if response.status == 200:
+            return response.status, await response.json()
+        return response.status, None
 
 async def test_hpke_api():
     """Test the complete HPKE API flow."""
@@ -17,112 +57,94 @@ async def test_hpke_api():
     base_url = "http://localhost:8000"
     
     async with aiohttp.ClientSession() as session:
+        # Health and pubkey probes are independent, so issue them together
+        (health_status, health_data), (pubkey_status, pubkey_data) = await asyncio.gather(
+            _get_json(session, f"{base_url}/health"),
+            _get_json(session, f"{base_url}/api/pubkey"),
+        )
+        
         # Test health endpoint
         print("1️⃣ Testing health endpoint...")
-        async with session.get(f"{base_url}/health") as response:
-            if response.status == 200:
-                health_data = await response.json()
-                print(f"✅ Health: {health_data['status']}")
-            else:
-                print(f"❌ Health check failed: {response.status}")
-                return False
+        assert health_data is not None, f"health check failed: {health_status}"
+        print(f"✅ Health: {health_data['status']}")
         
         # Test pubkey endpoint
         print("\n2️⃣ Testing pubkey endpoint...")
-        async with session.get(f"{base_url}/api/pubkey") as response:
-            if response.status == 200:
-                pubkey_data = await response.json()
-                print(f"✅ Got pubkey: {pubkey_data['key_id']}")
-                print(f"   Algorithm: {pubkey_data.get('algorithm', 'N/A')}")
-            else:
-                print(f"❌ Pubkey check failed: {response.status}")
-                return False
+        assert pubkey_data is not None, f"pubkey check failed: {pubkey_status}"
+        print(f"✅ Got pubkey: {pubkey_data['key_id']}")
+        print(f"   Algorithm: {pubkey_data.get('algorithm', 'N/A')}")
         
         # Test chat endpoint with HPKE
         print("\n3️⃣ Testing HPKE chat endpoint...")
         
-        # Prepare the chat request
-        payload = {
-            "messages": [{"role": "user", "content": "Who were the presidents in the US in the 90s?"}],
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "max_tokens": 100
-        }
-        payload_json = json.dumps(payload)
-        
-        # For testing, we base64-encode the JSON (simulating HPKE encryption)
-        ciphertext_b64 = base64.b64encode(payload_json.encode('utf-8')).decode('ascii')
+        chat_request = _BASE_REQUEST.copy()
+        chat_request["timestamp"] = "2025-08-20T14:50:00Z"
+        chat_request["request_id"] = "test-e2e-presidents-456"
         
-        chat_request = {
-            "encapsulated_key": base64.b64encode(b"mock_encapsulated_key_32bytes__").decode('ascii'),
-            "ciphertext": ciphertext_b64,
-            "aad": base64.b64encode(b"test_aad").decode('ascii'),
-            "timestamp": "2025-08-20T14:50:00Z",
-            "request_id": "test-e2e-presidents-456",
-            "device_pubkey": base64.b64encode(b"mock_device_pubkey_32bytes____").decode('ascii')
-        }
+        print(f"📝 Sending question: {_PAYLOAD['messages'][0]['content']}")
         
-        print(f"📝 Sending question: {payload['messages'][0]['content']}")
-        
-        try:
-            async with session.post(
-                f"{base_url}/api/chat",
-                json=chat_request,
-                headers={"Content-Type": "application/json"}
-            ) as response:
-                print(f"📡 Response status: {response.status}")
-                print(f"📡 Response headers: {dict(response.headers)}")
-                
-                if response.status != 200:
-                    error_text = await response.text()
-                    print(f"❌ Request failed: {error_text}")
-                    return False
-                
-                # Read the streaming response
-                chunk_count = 0
-                print("📦 Reading chunks...")
-                
-                async for line in response.content:
-                    line = line.decode('utf-8').strip()
-                    if line:
-                        print(f"🔗 Raw line: {line}")
-                        
-                        if line.startswith('event: '):
-                            event_type = line[7:]
-                            print(f"   📋 Event: {event_type}")
-                        elif line.startswith('data: '):
-                            data = line[6:]
-                            print(f"   📄 Data: {data[:100]}...")
-                            
-                            if event_type == 'chunk':
-                                try:
-                                    # Parse the encrypted chunk
-                                    encrypted_chunk = json.loads(data)
-                                    # For testing, decode the base64 ciphertext
-                                    chunk_text = base64.b64decode(encrypted_chunk['ciphertext']).decode('utf-8')
-                                    print(f"   ✨ Decrypted: '{chunk_text}'")
-                                    chunk_count += 1
-                                except Exception as e:
-                                    print(f"   ❌ Failed to decrypt: {e}")
-                            elif event_type == 'end':
-                                print("   🏁 End event received")
-                                break
-                            elif event_type == 'error':
-                                print(f"   ❌ Error event: {data}")
-                                return False
+        async with session.post(
+            f"{base_url}/api/chat",
+            data=orjson.dumps(chat_request),
+            headers={"Content-Type": "application/json"}
+        ) as response:
+            print(f"📡 Response status: {response.status}")
+            print(f"📡 Response headers: {dict(response.headers)}")
+            
+            if response.status != 200:
+                error_text = await response.text()
+                raise AssertionError(f"request failed: {error_text}")
+            
+            # Read the streaming response; collect output and print it once
+            chunk_count = 0
+            log = []
+            print("📦 Reading chunks...")
+            
+            async for line in _iter_lines(response):
+                line = line.strip()
+                if line:
+                    if VERBOSE:
+                        log.append(f"🔗 Raw line: {line}")
+                    
+                    key, sep, value = line.partition(': ')
+                    if not sep:
+                        continue
+                    
+                    if key == 'event':
+                        event_type = value
+                        if VERBOSE:
+                            log.append(f"   📋 Event: {event_type}")
+                    elif key == 'data':
+                        data = value
+                        if VERBOSE:
+                            log.append(f"   📄 Data: {data[:100]}...")
                         
-                        # Stop after reasonable number of chunks
-                        if chunk_count > 20:
-                            print("   ⏹️ Stopping after 20 chunks for test")
+                        if event_type == 'chunk':
+                            try:
+                                # Parse the encrypted chunk
+                                encrypted_chunk = orjson.loads(data)
+                                # For testing, decode the base64 ciphertext
+                                chunk_text = base64.b64decode(encrypted_chunk['ciphertext']).decode('utf-8')
+                                log.append(f"   ✨ Decrypted: '{chunk_text}'")
+                                chunk_count += 1
+                            except Exception as e:
+                                log.append(f"   ❌ Failed to decrypt: {e}")
+                        elif event_type == 'end':
+                            log.append("   🏁 End event received")
                             break
-                
-                print(f"\n✅ Streaming test completed! Got {chunk_count} chunks")
-                return True
-                
-        except Exception as e:
-            print(f"❌ Request failed with exception: {e}")
-            return False
+                        elif event_type == 'error':
+                            log.append(f"   ❌ Error event: {data}")
+                            print("\n".join(log))
+                            raise AssertionError(f"error event: {data}")
+                    
+                    # Stop after reasonable number of chunks
+                    if chunk_count > 20:
+                        log.append("   ⏹️ Stopping after 20 chunks for test")
+                        break
+            
+            print("\n".join(log))
+            print(f"\n✅ Streaming test completed! Got {chunk_count} chunks")
+            
 
 if __name__ == "__main__":
-    success = asyncio.run(test_hpke_api())
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    asyncio.run(test_hpke_api())
\ No newline at end of file
@@ -2,37 +2,53 @@
 """
 Test script for the new /inference endpoint (step 9 implementation).
 Tests both direct inference and streaming with parameter guardrails.
+
+The streaming and guardrails tests run concurrently over one HTTP/2
+connection. That needs an h2-capable server behind TLS, since httpx only
+negotiates HTTP/2 through ALPN; uvicorn serves HTTP/1.1 only. For example:
+
+    hypercorn main:app --bind localhost:8443 --certfile cert.pem --keyfile key.pem
+    ROUTER_BASE_URL=https://localhost:8443 python test_inference_endpoint.py
+
+Against plain uvicorn the tests still run, over HTTP/1.1, with a warning.
 """
 
 import asyncio
+import os
 import httpx
 import time
-from datetime import datetime
 
 # Base URL for the router
-BASE_URL = "http://localhost:8000"
+BASE_URL = os.environ.get("ROUTER_BASE_URL", "http://localhost:8000")
 
+# Print each streamed token as it arrives
+VERBOSE = True
 
-async def test_health_check():
+
+async def test_health_check(client: httpx.AsyncClient):
     """Test the health endpoint first."""
     print("=== Testing Health Check ===")
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BASE_URL}/health")
-            print(f"Health Status: {response.status_code}")
-            if response.status_code == 200:
-                data = response.json()
-                print(f"Service Status: {data['status']}")
-                return data['status'] == 'healthy'
-            else:
-                print("Health check failed")
-                return False
+        response = await client.get("/health")
+        print(f"Health Status: {response.status_code} ({response.http_version})")
+        if response.http_version != "HTTP/2":
+            print(
+                f"⚠️  Negotiated {response.http_version}, not HTTP/2: the "
+                "concurrent tests will not multiplex (see module docstring)"
+            )
+        if response.status_code == 200:
+            data = response.json()
+            print(f"Service Status: {data['status']}")
+            return data['status'] == 'healthy'
+        else:
+            print("Health check failed")
+            return False
     except Exception as e:
         print(f"Health check error: {e}")
         return False
 
 
-async def test_inference_endpoint():
+async def test_inference_endpoint(client: httpx.AsyncClient):
     """Test the new /inference endpoint with streaming."""
     print("\n=== Testing /inference Endpoint ===")
     
@@ -44,72 +60,67 @@ async def test_inference_endpoint():
         "temperature": 0.8,  # Should be clamped by guardrails
         "top_p": 0.9,
         "max_tokens": 100,
-        "request_id": f"test-{datetime.now().isoformat()}"
+        "request_id": f"test-{time.perf_counter_ns()}"
     }
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            print(f"Sending request: {test_request['messages'][0]['content']}")
-            print(f"Parameters: temp={test_request['temperature']}, top_p={test_request['top_p']}, max_tokens={test_request['max_tokens']}")
+        print(f"Sending request: {test_request['messages'][0]['content']}")
+        print(f"Parameters: temp={test_request['temperature']}, top_p={test_request['top_p']}, max_tokens={test_request['max_tokens']}")
             
-            async with client.stream(
-                "POST",
-                f"{BASE_URL}/inference",
-                json=test_request,
-                headers={"Accept": "text/event-stream"}
-            ) as response:
+        async with client.stream(
+            "POST",
+            "/inference",
+            json=test_request,
+            headers={"Accept": "text/event-stream"}
+        ) as response:
                 
-                if response.status_code != 200:
-                    print(f"Error: Status {response.status_code}")
-                    print(await response.aread())
-                    return False
+            if response.status_code != 200:
+                print(f"Error: Status {response.status_code}")
+                print(await response.aread())
+                return False
                 
-                print(f"Response Status: {response.status_code}")
-                print("Streaming tokens:")
-                print("-" * 40)
+            print(f"Response Status: {response.status_code}")
+            print("Streaming tokens:")
+            print("-" * 40)
                 
-                token_count = 0
-                start_time = time.time()
+            token_count = 0
+            start_time = time.time()
                 
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        data = line[6:]  # Remove "data: " prefix
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    data = line[6:]  # Remove "data: " prefix
                         
-                        if not data.strip():
-                            continue
+                    if not data.strip():
+                        continue
                             
-                        try:
-                            print(f"Raw SSE data: {data}")
-                            # The token should be in the data field
-                            if data and data != '':
-                                token_count += 1
-                                print(f"Token {token_count}: {repr(data)}")
-                        except Exception as e:
-                            print(f"Parse error: {e}")
+                    # The token is the data field itself
+                    token_count += 1
+                    if VERBOSE:
+                        print(f"Token {token_count}: {data!r}")
                     
-                    elif line.startswith("event: "):
-                        event_type = line[7:]  # Remove "event: " prefix  
-                        print(f"Event: {event_type}")
+                elif line.startswith("event: "):
+                    event_type = line[7:]  # Remove "event: " prefix  
+                    print(f"Event: {event_type}")
                         
-                        if event_type == "done":
-                            print("Stream completed successfully")
-                            break
-                        elif event_type == "error":
-                            print("Stream error received")
-                            break
+                    if event_type == "done":
+                        print("Stream completed successfully")
+                        break
+                    elif event_type == "error":
+                        print("Stream error received")
+                        break
                 
-                elapsed = time.time() - start_time
-                print("-" * 40)
-                print(f"Received {token_count} tokens in {elapsed:.2f}s")
-                print(f"Tokens/second: {token_count/elapsed:.2f}")
-                return token_count > 0
+            elapsed = time.time() - start_time
+            print("-" * 40)
+            print(f"Received {token_count} tokens in {elapsed:.2f}s")
+            print(f"Tokens/second: {token_count/elapsed:.2f}")
+            return token_count > 0
                 
     except Exception as e:
         print(f"Inference test error: {e}")
         return False
 
 
-async def test_parameter_guardrails():
+async def test_parameter_guardrails(client: httpx.AsyncClient):
     """Test parameter guardrails enforcement."""
     print("\n=== Testing Parameter Guardrails ===")
     
@@ -121,28 +132,28 @@ async def test_parameter_guardrails():
         "temperature": 1.8,  # Should be clamped to 1.5 by our guardrails
         "top_p": 0.98,       # Should be clamped to 0.95 by our guardrails
         "max_tokens": 5000,  # Should be clamped to 4096 by our guardrails
-        "request_id": f"guardrails-test-{datetime.now().isoformat()}"
+        "request_id": f"guardrails-test-{time.perf_counter_ns()}"
     }
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            print("Testing parameters that trigger our custom guardrails:")
-            print("Input: temp=1.8, top_p=0.98, max_tokens=5000")
-            print("Expected: clamped to temp=1.5, top_p=0.95, max_tokens=4096")
+        print("Testing parameters that trigger our custom guardrails:")
+        print("Input: temp=1.8, top_p=0.98, max_tokens=5000")
+        print("Expected: clamped to temp=1.5, top_p=0.95, max_tokens=4096")
             
-            response = await client.post(
-                f"{BASE_URL}/inference",
-                json=extreme_request,
-                headers={"Accept": "text/event-stream"}
-            )
+        response = await client.post(
+            "/inference",
+            json=extreme_request,
+            headers={"Accept": "text/event-stream"},
+            timeout=10.0,
+        )
             
-            if response.status_code == 200:
-                print("✓ Request accepted (parameters clamped by guardrails)")
-                return True
-            else:
-                print(f"✗ Request failed: {response.status_code}")
-                print(await response.aread())
-                return False
+        if response.status_code == 200:
+            print("✓ Request accepted (parameters clamped by guardrails)")
+            return True
+        else:
+            print(f"✗ Request failed: {response.status_code}")
+            print(await response.aread())
+            return False
                 
     except Exception as e:
         print(f"Guardrails test error: {e}")
@@ -152,25 +163,34 @@ async def test_parameter_guardrails():
 async def main():
     """Run all inference tests."""
     print("Starting inference endpoint tests...")
-    
-    # Test health first
-    healthy = await test_health_check()
-    if not healthy:
-        print("❌ Health check failed - make sure inference server is running")
-        return
-    
-    # Test basic inference streaming
-    inference_ok = await test_inference_endpoint()
-    if not inference_ok:
-        print("❌ Inference endpoint test failed")
-        return
-    
-    # Test parameter guardrails
-    guardrails_ok = await test_parameter_guardrails()
-    if not guardrails_ok:
-        print("❌ Parameter guardrails test failed")
-        return
-    
+
+    # One client for every test so the streaming and guardrails requests share
+    # a connection. HTTP/2 is only negotiated when the router is served by an
+    # h2-capable server (e.g. hypercorn behind TLS); uvicorn stays on HTTP/1.1.
+    async with httpx.AsyncClient(
+        base_url=BASE_URL,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        timeout=30.0,
+    ) as client:
+        # Test health first
+        healthy = await test_health_check(client)
+        if not healthy:
+            print("❌ Health check failed - make sure inference server is running")
+            return
+
+        # Streaming inference and the guardrails POST are independent, so
+        # run them together; over HTTP/2 they multiplex on one connection
+        inference_ok, guardrails_ok = await asyncio.gather(
+            test_inference_endpoint(client), test_parameter_guardrails(client)
+        )
+        if not inference_ok:
+            print("❌ Inference endpoint test failed")
+            return
+        if not guardrails_ok:
+            print("❌ Parameter guardrails test failed")
+            return
+
     print("\n" + "="*50)
     print("✅ All inference tests passed!")
     print("✅ Step 9 implementation working correctly:")
@@ -6,18 +6,47 @@ for unit tests, integration tests, and test utilities.
 """
 
 import base64
-import json
 import os
 import tempfile
+import time
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, Mock, patch
 
+import orjson
 import pytest
 from fastapi.testclient import TestClient
 
 from config import Settings
 from services.hpke_service import HPKEService
 
+# Constant base64 fields shared by every mock HPKE request
+MOCK_ENCAPSULATED_KEY_B64 = base64.b64encode(b"mock_encapsulated_key_32bytes__").decode(
+    "ascii"
+)
+MOCK_AAD_B64 = base64.b64encode(b"test_aad").decode("ascii")
+MOCK_DEVICE_PUBKEY_B64 = base64.b64encode(b"mock_device_pubkey_32bytes____").decode(
+    "ascii"
+)
+
+# (epoch second, ISO string) for _iso_now_cached()
+_ISO_CACHE = (-1, "")
+
+
+def _iso_now_cached() -> str:
+    """Current UTC time as ISO string, re-formatted at most once per second."""
+    global _ISO_CACHE
+    now = int(time.time())
+    if _ISO_CACHE[0] != now:
+        _ISO_CACHE = (now, datetime.fromtimestamp(now, timezone.utc).isoformat())
+    return _ISO_CACHE[1]
+
+
+_HPKE_REQUEST_TEMPLATE = {
+    "encapsulated_key": MOCK_ENCAPSULATED_KEY_B64,
+    "aad": MOCK_AAD_B64,
+    "device_pubkey": MOCK_DEVICE_PUBKEY_B64,
+}
+
 
 @pytest.fixture
 def temp_dir():
@@ -80,7 +109,7 @@ def mock_inference_client():
         for chunk in chunks:
             yield {"choices": [{"delta": {"content": chunk}}]}
 
-    mock_client.chat_completion_stream = AsyncMock(return_value=mock_stream())
+    mock_client.chat_completion_stream = mock_stream
     return mock_client
 
 
@@ -98,21 +127,13 @@ def sample_chat_payload():
 @pytest.fixture
 def sample_hpke_request(sample_chat_payload):
     """Sample HPKE encrypted request for testing."""
-    payload_json = json.dumps(sample_chat_payload)
-    ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
+    ciphertext = base64.b64encode(orjson.dumps(sample_chat_payload)).decode("ascii")
 
-    return {
-        "encapsulated_key": base64.b64encode(b"mock_encapsulated_key_32bytes__").decode(
-            "ascii"
-        ),
-        "ciphertext": ciphertext,
-        "aad": base64.b64encode(b"test_aad").decode("ascii"),
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "request_id": "test-request-123",
-        "device_pubkey": base64.b64encode(b"mock_device_pubkey_32bytes____").decode(
-            "ascii"
-        ),
-    }
+    request = _HPKE_REQUEST_TEMPLATE.copy()
+    request["ciphertext"] = ciphertext
+    request["timestamp"] = _iso_now_cached()
+    request["request_id"] = "test-request-123"
+    return request
 
 
 @pytest.fixture
@@ -140,16 +161,32 @@ def setup_test_environment(monkeypatch):
     monkeypatch.setenv("INFERENCE_TRANSPORT", "mock")
 
 
+FROZEN_TIMESTAMP = 1640995200.0  # 2022-01-01T00:00:00Z
+FROZEN_DATETIME = datetime.fromtimestamp(FROZEN_TIMESTAMP, timezone.utc)
+
+
+class _FrozenDateTime(datetime):
+    """datetime subclass whose now()/utcnow() always return FROZEN_DATETIME."""
+
+    @classmethod
+    def now(cls, tz=None):
+        if tz is None:
+            return FROZEN_DATETIME.replace(tzinfo=None)
+        return FROZEN_DATETIME.astimezone(tz)
+
+    @classmethod
+    def utcnow(cls):
+        return FROZEN_DATETIME.replace(tzinfo=None)
+
+
 @pytest.fixture
-def mock_time():
+def mock_time(monkeypatch):
     """Mock time functions for deterministic testing."""
-    with patch("time.time", return_value=1640995200.0):  # Fixed timestamp
-        with patch("datetime.datetime") as mock_datetime:
-            mock_datetime.now.return_value = datetime(
-                2022, 1, 1, 0, 0, 0, tzinfo=timezone.utc
-            )
-            mock_datetime.side_effect = lambda *args, **kw: datetime(*args, **kw)
-            yield mock_datetime
+    # Plain attribute swaps on the time/datetime modules; construction still
+    # goes through the real datetime type, so there is no side_effect recursion.
+    monkeypatch.setattr("time.time", lambda: FROZEN_TIMESTAMP)
+    monkeypatch.setattr("datetime.datetime", _FrozenDateTime)
+    yield _FrozenDateTime
 
 
 # Test utilities
@@ -161,20 +198,15 @@ class TestHelpers:
         payload, request_id=None, timestamp=None, device_pubkey=None
     ):
         """Create a properly formatted HPKE request for testing."""
-        payload_json = json.dumps(payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
+        ciphertext = base64.b64encode(orjson.dumps(payload)).decode("ascii")
 
-        return {
-            "encapsulated_key": base64.b64encode(
-                b"mock_encapsulated_key_32bytes__"
-            ).decode("ascii"),
-            "ciphertext": ciphertext,
-            "aad": base64.b64encode(b"test_aad").decode("ascii"),
-            "timestamp": timestamp or datetime.now(timezone.utc).isoformat(),
-            "request_id": request_id or f"test-{datetime.now().timestamp()}",
-            "device_pubkey": device_pubkey
-            or base64.b64encode(b"mock_device_pubkey_32bytes____").decode("ascii"),
-        }
+        request = _HPKE_REQUEST_TEMPLATE.copy()
+        request["ciphertext"] = ciphertext
+        request["timestamp"] = timestamp or _iso_now_cached()
+        request["request_id"] = request_id or f"test-{time.perf_counter_ns()}"
+        if device_pubkey:
+            request["device_pubkey"] = device_pubkey
+        return request
 
     @staticmethod
     def assert_valid_hpke_response(response_data):
@@ -340,7 +372,7 @@ def test_data_generator():
                         "encapsulated_key": "invalid-base64!@#",
                         "ciphertext": "also-invalid!@#",
                         "aad": base64.b64encode(b"test").decode(),
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                        "timestamp": _iso_now_cached(),
                         "request_id": "invalid-test",
                         "device_pubkey": base64.b64encode(b"mock").decode(),
                     },
@@ -378,7 +410,6 @@ def cleanup_test_files():
 
     # Cleanup any temporary files that might have been created
     import glob
-    import os
 
     test_files = glob.glob("test_*.tmp") + glob.glob("*.test")
     for file in test_files:
@@ -145,7 +145,7 @@ run_locust_tests() {
         -t "$duration" \
         --html="$html_report" \
         --csv="$csv_prefix" \
-        --print-stats \
+        --only-summary \
         "$user_class"
     
     print_success "Locust test completed. Report saved to $html_report"
@@ -9,41 +9,133 @@ Tests include:
 - Error handling
 """
 
-import base64
-import json
 import os
-import tempfile
+import time
 from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 
+import orjson
+import pybase64
 import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
 
 from config import Settings
 from models import ChatRequest, DecryptedChatPayload
 from services.hpke_service import HPKEService
 
+# Mock HPKE fields shared by most requests below, encoded once
+_MOCK_KEY_B64 = pybase64.b64encode_as_string(b"mock_key")
+_TEST_AAD_B64 = pybase64.b64encode_as_string(b"test_aad")
+_MOCK_PUBKEY_B64 = pybase64.b64encode_as_string(b"mock_pubkey")
+_MOCK_ENCAPSULATED_KEY_B64 = pybase64.b64encode_as_string(
+    b"mock_encapsulated_key_32bytes__"
+)
+_MOCK_DEVICE_PUBKEY_B64 = pybase64.b64encode_as_string(
+    b"mock_device_pubkey_32bytes____"
+)
+_MOCK_RECIPIENT_PUBKEY = b"mock_recipient_pubkey_32bytes__"
+_TEST_CIPHERTEXT_B64 = pybase64.b64encode_as_string(
+    orjson.dumps({"messages": [{"role": "user", "content": "Test"}]})
+)
+# Frozen service clock: 2022-01-01T00:00:00Z
+_FROZEN_TIME = 1640995200.0
+_FROZEN_NOW = datetime.fromtimestamp(_FROZEN_TIME, timezone.utc)
+
+# Private scalar of the deterministic key pair written by _write_fixed_key_files
+_FIXED_KEY_SCALAR = 0x1F2E3D4C5B6A79880F1E2D3C4B5A69780F1E2D3C4B5A6978897A6B5C4D3E2F10
+
+# AAD bytes encrypt_chunk should attach to chunks 0..4
+_EXPECTED_CHUNK_AAD = tuple(f"chunk-{seq}".encode("utf-8") for seq in range(5))
+
+
+def _make_request(
+    request_id: str,
+    timestamp=None,
+    encapsulated_key: str = _MOCK_KEY_B64,
+    ciphertext: str = _TEST_CIPHERTEXT_B64,
+) -> ChatRequest:
+    """
+    Build a mock ChatRequest, by default carrying the "Test" payload.
+
+    Fields are already well-typed, so skip pydantic validation here;
+    test_decrypt_request_valid still goes through the validating constructor.
+    """
+    return ChatRequest.model_construct(
+        encapsulated_key=encapsulated_key,
+        ciphertext=ciphertext,
+        aad=_TEST_AAD_B64,
+        timestamp=timestamp or _FROZEN_NOW,
+        request_id=request_id,
+        device_pubkey=_MOCK_PUBKEY_B64,
+    )
+
+
+def _write_fixed_key_files(settings: Settings) -> bytes:
+    """Write a pre-generated P-256 key pair to the settings' key paths.
+
+    Returns the PEM public key, so tests can check the service loaded it.
+    """
+    private_key = ec.derive_private_key(_FIXED_KEY_SCALAR, ec.SECP256R1())
+    public_pem = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    with open(settings.ROUTER_HPKE_PRIVATE_KEY_PATH, "wb") as f:
+        f.write(
+            private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption(),
+            )
+        )
+    with open(settings.ROUTER_HPKE_PUBLIC_KEY_PATH, "wb") as f:
+        f.write(public_pem)
+    return public_pem
+
+
+def _settings_for(key_dir) -> Settings:
+    """Test settings keeping the HPKE key files under key_dir."""
+    return Settings(
+        ENVIRONMENT="test",
+        ROUTER_HPKE_PRIVATE_KEY_PATH=os.path.join(key_dir, "hpke-private.key"),
+        ROUTER_HPKE_PUBLIC_KEY_PATH=os.path.join(key_dir, "hpke-public.key"),
+        HPKE_KEY_ROTATION_HOURS=24,
+        REQUEST_TTL_SECONDS=60,
+        MLOCK_SECRETS=False,  # Disable for testing
+    )
+
+
+# No xdist_group here, unlike test_integration_e2e: each xdist worker builds
+# its own shared service and every test keeps its key files in a private temp
+# dir, so loadgroup can spread these tests over every worker.
+@pytest.fixture(scope="module")
+def shared_hpke_service(tmp_path_factory):
+    """One HPKEService for the whole module; key generation dominates setup."""
+    return HPKEService(_settings_for(tmp_path_factory.mktemp("hpke-keys")))
+
 
 class TestHPKEService:
     """Test suite for HPKEService functionality."""
 
     @pytest.fixture
-    def temp_settings(self):
-        """Create test settings with temporary directories."""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            settings = Settings(
-                ENVIRONMENT="test",
-                ROUTER_HPKE_PRIVATE_KEY_PATH=os.path.join(temp_dir, "hpke-private.key"),
-                ROUTER_HPKE_PUBLIC_KEY_PATH=os.path.join(temp_dir, "hpke-public.key"),
-                HPKE_KEY_ROTATION_HOURS=24,
-                REQUEST_TTL_SECONDS=60,
-                MLOCK_SECRETS=False,  # Disable for testing
-            )
-            yield settings
+    def temp_settings(self, tmp_path):
+        """Create test settings with key files in a temporary directory."""
+        return _settings_for(tmp_path)
+
+    @pytest.fixture
+    def hpke_service(self, shared_hpke_service, monkeypatch):
+        """Shared HPKEService on the frozen clock, replay state cleared."""
+        shared_hpke_service.seen_request_ids.clear()
+        monkeypatch.setattr(shared_hpke_service, "_clock", lambda: _FROZEN_TIME)
+        return shared_hpke_service
 
     @pytest.fixture
-    def hpke_service(self, temp_settings):
-        """Create HPKEService instance for testing."""
-        return HPKEService(temp_settings)
+    def fresh_hpke_service(self, temp_settings, monkeypatch):
+        """Private HPKEService on the frozen clock, for tests that change its keys."""
+        service = HPKEService(temp_settings)
+        monkeypatch.setattr(service, "_clock", lambda: _FROZEN_TIME)
+        return service
 
     def test_service_initialization(self, hpke_service):
         """Test that HPKEService initializes correctly."""
@@ -69,7 +161,7 @@ class TestHPKEService:
         assert pubkeys["algorithm"] == "X25519-HKDF-SHA256+ChaCha20-Poly1305"
 
         # Verify base64 encoding
-        current_pubkey_bytes = base64.b64decode(pubkeys["current_pubkey"])
+        current_pubkey_bytes = pybase64.b64decode(pubkeys["current_pubkey"])
         assert len(current_pubkey_bytes) > 0
 
     def test_decrypt_request_valid(self, hpke_service):
@@ -83,20 +175,15 @@ class TestHPKEService:
         }
 
         # Simulate client encryption (base64 for testing)
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
+        ciphertext = pybase64.b64encode(orjson.dumps(test_payload)).decode("ascii")
 
         request = ChatRequest(
-            encapsulated_key=base64.b64encode(
-                b"mock_encapsulated_key_32bytes__"
-            ).decode("ascii"),
+            encapsulated_key=_MOCK_ENCAPSULATED_KEY_B64,
             ciphertext=ciphertext,
-            aad=base64.b64encode(b"test_aad").decode("ascii"),
-            timestamp=datetime.now(timezone.utc),
+            aad=_TEST_AAD_B64,
+            timestamp=_FROZEN_NOW,
             request_id="test-request-unique-123",
-            device_pubkey=base64.b64encode(b"mock_device_pubkey_32bytes____").decode(
-                "ascii"
-            ),
+            device_pubkey=_MOCK_DEVICE_PUBKEY_B64,
         )
 
         # Test decryption
@@ -111,18 +198,7 @@ class TestHPKEService:
     def test_decrypt_request_replay_protection(self, hpke_service):
         """Test replay protection mechanisms."""
         # Create valid request
-        test_payload = {"messages": [{"role": "user", "content": "Test"}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
-
-        request = ChatRequest(
-            encapsulated_key=base64.b64encode(b"mock_key").decode("ascii"),
-            ciphertext=ciphertext,
-            aad=base64.b64encode(b"test_aad").decode("ascii"),
-            timestamp=datetime.now(timezone.utc),
-            request_id="replay-test-123",
-            device_pubkey=base64.b64encode(b"mock_pubkey").decode("ascii"),
-        )
+        request = _make_request("replay-test-123")
 
         # First request should succeed
         decrypted = hpke_service.decrypt_request(request)
@@ -135,22 +211,9 @@ class TestHPKEService:
     def test_decrypt_request_expired_timestamp(self, hpke_service):
         """Test rejection of expired requests."""
         # Create request with old timestamp
-        test_payload = {"messages": [{"role": "user", "content": "Test"}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
+        old_timestamp = _FROZEN_NOW - timedelta(seconds=120)  # 2 minutes old
 
-        old_timestamp = datetime.now(timezone.utc) - timedelta(
-            seconds=120
-        )  # 2 minutes old
-
-        request = ChatRequest(
-            encapsulated_key=base64.b64encode(b"mock_key").decode("ascii"),
-            ciphertext=ciphertext,
-            aad=base64.b64encode(b"test_aad").decode("ascii"),
-            timestamp=old_timestamp,
-            request_id="expired-test-123",
-            device_pubkey=base64.b64encode(b"mock_pubkey").decode("ascii"),
-        )
+        request = _make_request("expired-test-123", timestamp=old_timestamp)
 
         # Should fail due to expired timestamp
         with pytest.raises(ValueError, match="Request failed replay protection"):
@@ -159,38 +222,36 @@ class TestHPKEService:
     def test_decrypt_request_future_timestamp(self, hpke_service):
         """Test rejection of future requests (clock skew protection)."""
         # Create request with future timestamp
-        test_payload = {"messages": [{"role": "user", "content": "Test"}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
-
-        future_timestamp = datetime.now(timezone.utc) + timedelta(
-            seconds=60
-        )  # 1 minute future
+        future_timestamp = _FROZEN_NOW + timedelta(seconds=60)  # 1 minute future
 
-        request = ChatRequest(
-            encapsulated_key=base64.b64encode(b"mock_key").decode("ascii"),
-            ciphertext=ciphertext,
-            aad=base64.b64encode(b"test_aad").decode("ascii"),
-            timestamp=future_timestamp,
-            request_id="future-test-123",
-            device_pubkey=base64.b64encode(b"mock_pubkey").decode("ascii"),
-        )
+        request = _make_request("future-test-123", timestamp=future_timestamp)
 
         # Should fail due to future timestamp
         with pytest.raises(ValueError, match="Request failed replay protection"):
             hpke_service.decrypt_request(request)
 
+    def test_decrypt_request_naive_timestamp(self, hpke_service):
+        """Test rejection of timestamps without a UTC offset."""
+        # Same wall time as the frozen clock, but no tzinfo
+        naive_timestamp = _FROZEN_NOW.replace(tzinfo=None)
+
+        request = _make_request("naive-test-123", timestamp=naive_timestamp)
+
+        # Should fail rather than be read as server-local time
+        with pytest.raises(ValueError, match="Request failed replay protection"):
+            hpke_service.decrypt_request(request)
+        assert "naive-test-123" not in hpke_service.seen_request_ids
+
     def test_encrypt_chunk(self, hpke_service):
         """Test chunk encryption for streaming responses."""
         test_chunk = "This is a test response chunk."
-        recipient_pubkey = b"mock_recipient_pubkey_32bytes__"
 
         encrypted_chunk = hpke_service.encrypt_chunk(
-            test_chunk, recipient_pubkey, sequence=0
+            test_chunk, _MOCK_RECIPIENT_PUBKEY, sequence=0
         )
 
         # Parse encrypted chunk
-        chunk_data = json.loads(encrypted_chunk)
+        chunk_data = orjson.loads(encrypted_chunk)
 
         assert "encapsulated_key" in chunk_data
         assert "ciphertext" in chunk_data
@@ -202,22 +263,28 @@ class TestHPKEService:
         assert len(chunk_data["ciphertext"]) > 0
 
         # Verify AAD format
-        aad_bytes = base64.b64decode(chunk_data["aad"])
+        aad_bytes = pybase64.b64decode(chunk_data["aad"])
         assert aad_bytes == b"chunk-0"
 
     def test_encrypt_chunk_multiple_sequences(self, hpke_service):
         """Test chunk encryption with different sequence numbers."""
-        recipient_pubkey = b"mock_recipient_pubkey"
-
-        for seq in range(5):
+        for seq, expected_aad in enumerate(_EXPECTED_CHUNK_AAD):
             encrypted_chunk = hpke_service.encrypt_chunk(
-                f"Chunk {seq}", recipient_pubkey, sequence=seq
+                f"Chunk {seq}", _MOCK_RECIPIENT_PUBKEY, sequence=seq
             )
-            chunk_data = json.loads(encrypted_chunk)
+            chunk_data = orjson.loads(encrypted_chunk)
 
             assert chunk_data["sequence"] == seq
-            aad_bytes = base64.b64decode(chunk_data["aad"])
-            assert aad_bytes == f"chunk-{seq}".encode("utf-8")
+            aad_bytes = pybase64.b64decode(chunk_data["aad"])
+            assert aad_bytes == expected_aad
+
+    def test_encrypt_chunk_aad_beyond_cache(self, hpke_service):
+        """Test AAD for sequence numbers on both sides of the precomputed range."""
+        for seq in (4095, 4096, 100000):
+            chunk_data = orjson.loads(
+                hpke_service.encrypt_chunk("Chunk", _MOCK_RECIPIENT_PUBKEY, seq)
+            )
+            assert pybase64.b64decode(chunk_data["aad"]) == f"chunk-{seq}".encode()
 
     def test_key_rotation_status(self, hpke_service):
         """Test key rotation status reporting."""
@@ -236,33 +303,33 @@ class TestHPKEService:
         """Test that keys are not rotated when not expired."""
         assert not hpke_service.should_rotate_keys()
 
-    def test_should_rotate_keys_expired(self, hpke_service):
+    def test_should_rotate_keys_expired(self, fresh_hpke_service):
         """Test that keys are rotated when expired."""
         # Manually set expiration to past
-        hpke_service.key_expires_at = datetime.now(timezone.utc) - timedelta(hours=1)
-        assert hpke_service.should_rotate_keys()
+        fresh_hpke_service.key_expires_at = _FROZEN_NOW - timedelta(hours=1)
+        assert fresh_hpke_service.should_rotate_keys()
 
-    def test_key_rotation(self, hpke_service):
+    def test_key_rotation(self, fresh_hpke_service):
         """Test key rotation functionality."""
         # Store original keys
-        original_private = hpke_service.current_private_key
-        original_public = hpke_service.current_public_key
-        original_key_id = hpke_service.key_id
+        original_private = fresh_hpke_service.current_private_key
+        original_public = fresh_hpke_service.current_public_key
+        original_key_id = fresh_hpke_service.key_id
 
         # Perform rotation
-        hpke_service.rotate_keys()
+        fresh_hpke_service.rotate_keys()
 
         # Verify keys changed
-        assert hpke_service.current_private_key != original_private
-        assert hpke_service.current_public_key != original_public
-        assert hpke_service.key_id != original_key_id
+        assert fresh_hpke_service.current_private_key != original_private
+        assert fresh_hpke_service.current_public_key != original_public
+        assert fresh_hpke_service.key_id != original_key_id
 
         # Verify new next keys were generated
-        assert hpke_service.next_private_key is not None
-        assert hpke_service.next_public_key is not None
+        assert fresh_hpke_service.next_private_key is not None
+        assert fresh_hpke_service.next_public_key is not None
 
         # Verify expiration time updated
-        assert hpke_service.key_expires_at > datetime.now(timezone.utc)
+        assert fresh_hpke_service.key_expires_at > _FROZEN_NOW
 
     def test_key_persistence(self, temp_settings):
         """Test that keys are saved and loaded from files."""
@@ -277,29 +344,28 @@ class TestHPKEService:
         # Keys should be the same
         assert service2.key_id == key_id_1
         assert service2.current_public_key == public_key_1
+        assert os.path.exists(temp_settings.ROUTER_HPKE_PRIVATE_KEY_PATH)
+
+    def test_pregenerated_key_files(self, temp_settings):
+        """Test that deterministic keys come from pre-generated key files."""
+        public_pem = _write_fixed_key_files(temp_settings)
+
+        service1 = HPKEService(temp_settings)
+        service2 = HPKEService(temp_settings)
+
+        assert service1.current_public_key == public_pem
+        assert service2.current_public_key == public_pem
+        assert service1.next_public_key != public_pem
 
     def test_replay_id_cleanup(self, hpke_service):
         """Test that old request IDs are cleaned up."""
-        # Add some old request IDs
-        old_time = datetime.now(timezone.utc) - timedelta(hours=2)
+        # Add some old request IDs (stored as monotonic nanoseconds)
+        old_time = time.monotonic_ns() - 2 * 3600 * 1_000_000_000
         hpke_service.seen_request_ids["old-request-1"] = old_time
         hpke_service.seen_request_ids["old-request-2"] = old_time
 
         # Process a new request (triggers cleanup)
-        test_payload = {"messages": [{"role": "user", "content": "Test"}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
-
-        request = ChatRequest(
-            encapsulated_key=base64.b64encode(b"mock_key").decode("ascii"),
-            ciphertext=ciphertext,
-            aad=base64.b64encode(b"test_aad").decode("ascii"),
-            timestamp=datetime.now(timezone.utc),
-            request_id="new-request-123",
-            device_pubkey=base64.b64encode(b"mock_pubkey").decode("ascii"),
-        )
-
-        hpke_service.decrypt_request(request)
+        hpke_service.decrypt_request(_make_request("new-request-123"))
 
         # Old request IDs should be cleaned up
         assert "old-request-1" not in hpke_service.seen_request_ids
@@ -308,13 +374,10 @@ class TestHPKEService:
 
     def test_invalid_base64_handling(self, hpke_service):
         """Test handling of invalid base64 data."""
-        request = ChatRequest(
+        request = _make_request(
+            "invalid-test-123",
             encapsulated_key="invalid-base64!@#",
             ciphertext="also-invalid-base64!@#",
-            aad=base64.b64encode(b"test_aad").decode("ascii"),
-            timestamp=datetime.now(timezone.utc),
-            request_id="invalid-test-123",
-            device_pubkey=base64.b64encode(b"mock_pubkey").decode("ascii"),
         )
 
         with pytest.raises(ValueError, match="Decryption failed"):
@@ -323,50 +386,43 @@ class TestHPKEService:
     def test_malformed_ciphertext_handling(self, hpke_service):
         """Test handling of malformed ciphertext."""
         # Valid base64 but invalid JSON
-        invalid_ciphertext = base64.b64encode(b"not-json-data").decode("ascii")
+        invalid_ciphertext = pybase64.b64encode(b"not-json-data").decode("ascii")
 
-        request = ChatRequest(
-            encapsulated_key=base64.b64encode(b"mock_key").decode("ascii"),
-            ciphertext=invalid_ciphertext,
-            aad=base64.b64encode(b"test_aad").decode("ascii"),
-            timestamp=datetime.now(timezone.utc),
-            request_id="malformed-test-123",
-            device_pubkey=base64.b64encode(b"mock_pubkey").decode("ascii"),
-        )
+        request = _make_request("malformed-test-123", ciphertext=invalid_ciphertext)
 
         with pytest.raises(ValueError, match="Decryption failed"):
             hpke_service.decrypt_request(request)
 
-    @patch("services.hpke_service.logging")
-    def test_error_logging(self, mock_logging, hpke_service):
+    def test_error_logging(self, caplog, hpke_service):
         """Test that errors are properly logged without exposing sensitive data."""
         # Trigger decryption error
-        request = ChatRequest(
+        request = _make_request(
+            "logging-test-123",
             encapsulated_key="invalid-base64",
             ciphertext="invalid-base64",
-            aad=base64.b64encode(b"test_aad").decode("ascii"),
-            timestamp=datetime.now(timezone.utc),
-            request_id="logging-test-123",
-            device_pubkey=base64.b64encode(b"mock_pubkey").decode("ascii"),
         )
 
-        with pytest.raises(ValueError):
-            hpke_service.decrypt_request(request)
+        with caplog.at_level("ERROR", logger="services.hpke_service"):
+            with pytest.raises(ValueError):
+                hpke_service.decrypt_request(request)
 
         # Verify error was logged with only error type, not sensitive data
-        mock_logging.error.assert_called()
-        error_call = mock_logging.error.call_args[0][0]
-        assert "HPKE decryption failed" in error_call
-        assert "invalid-base64" not in error_call  # Sensitive data not logged
+        messages = [record.getMessage() for record in caplog.records]
+        assert any("HPKE decryption failed" in message for message in messages)
+        assert not any("invalid-base64" in message for message in messages)
 
     def test_memory_security_operations(self, hpke_service):
         """Test memory security operations."""
-        # Test that _zero_memory doesn't crash
-        test_data = b"sensitive data to zero"
-        hpke_service._zero_memory(test_data)
+        # Immutable bytes can't be wiped, but must not crash
+        hpke_service._zero_memory(b"sensitive data to zero")
+
+        # Mutable buffers are overwritten in place
+        buffer = bytearray(b"\xa5" * (64 * 1024))
+        hpke_service._zero_memory(buffer)
+        assert buffer == bytearray(len(buffer))
 
-        # Test should complete without error
-        assert True
+        # Empty buffers are a no-op
+        hpke_service._zero_memory(bytearray())
 
     @patch("services.hpke_service.ctypes.util.find_library")
     def test_mlock_fallback(self, mock_find_library, temp_settings):
@@ -380,23 +436,26 @@ class TestHPKEService:
 
     def test_concurrent_request_processing(self, hpke_service):
         """Test handling of multiple concurrent requests."""
-        test_payload = {"messages": [{"role": "user", "content": "Test"}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
-
         # Process multiple requests with different IDs
         for i in range(10):
-            request = ChatRequest(
-                encapsulated_key=base64.b64encode(b"mock_key").decode("ascii"),
-                ciphertext=ciphertext,
-                aad=base64.b64encode(b"test_aad").decode("ascii"),
-                timestamp=datetime.now(timezone.utc),
-                request_id=f"concurrent-test-{i}",
-                device_pubkey=base64.b64encode(b"mock_pubkey").decode("ascii"),
+            decrypted = hpke_service.decrypt_request(
+                _make_request(f"concurrent-test-{i}")
             )
-
-            decrypted = hpke_service.decrypt_request(request)
             assert decrypted is not None
 
         # All request IDs should be tracked
         assert len(hpke_service.seen_request_ids) == 10
+
+    def test_decrypt_request_sequence(self, hpke_service):
+        """Test decrypting a run of requests, then replaying one of them."""
+        requests = [_make_request(f"batch-test-{i}") for i in range(10)]
+
+        decrypted = [hpke_service.decrypt_request(request) for request in requests]
+
+        assert len(decrypted) == 10
+        assert all(payload.messages[0]["content"] == "Test" for payload in decrypted)
+        assert len(hpke_service.seen_request_ids) == 10
+
+        # Replaying any earlier request fails
+        with pytest.raises(ValueError, match="Request failed replay protection"):
+            hpke_service.decrypt_request(requests[0])
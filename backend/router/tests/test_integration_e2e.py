@@ -12,21 +12,87 @@ Tests include:
 
 import asyncio
 import base64
-import json
 import tempfile
+import time
+from contextlib import ExitStack
 from datetime import datetime, timezone
+from functools import lru_cache
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, Mock, patch
 
+import httpx
+import orjson
 import pytest
-from fastapi.testclient import TestClient
+import pytest_asyncio
 
 from config import Settings
 
+# The module shares one app (rate limiter, replay cache, circuit breaker), so
+# keep all of its tests on the same xdist worker.
+pytestmark = [
+    pytest.mark.asyncio(loop_scope="module"),
+    pytest.mark.xdist_group("e2e_app"),
+]
+
+# Constant request fields, encoded once for the module
+_MOCK_KEY_B64 = base64.b64encode(b"mock_key").decode("ascii")
+_AAD_B64 = base64.b64encode(b"test_aad").decode("ascii")
+_PUBKEY_B64 = base64.b64encode(b"mock_pubkey").decode("ascii")
+_ENCAPSULATED_KEY_B64 = base64.b64encode(b"mock_encapsulated_key_32bytes__").decode(
+    "ascii"
+)
+_DEVICE_PUBKEY_B64 = base64.b64encode(b"mock_device_pubkey_32bytes____").decode("ascii")
+
+
+def _encode_payload(payload):
+    """Simulate HPKE encryption (simplified for testing): base64 of the JSON."""
+    return base64.b64encode(orjson.dumps(payload)).decode("ascii")
+
+
+_CIPHERTEXT_B64 = _encode_payload({"messages": [{"role": "user", "content": "Test"}]})
+# 10KB message for test_large_payload_handling, encoded once at import
+_LARGE_CIPHERTEXT_B64 = _encode_payload(
+    {"messages": [{"role": "user", "content": "A" * 10000}]}
+)
+
+
+@lru_cache(maxsize=1)
+def _iso_timestamp(epoch_second):
+    """ISO timestamp for an epoch second; only the current second stays cached."""
+    return datetime.fromtimestamp(epoch_second, timezone.utc).isoformat()
+
+
+def _mk_request(request_id, ciphertext=_CIPHERTEXT_B64, timestamp=None, **overrides):
+    """Build an encrypted chat request body from the shared constants.
+
+    Replay protection keys on ``request_id``, so requests built within the same
+    second share one formatted timestamp.
+    """
+    request = {
+        "encapsulated_key": _MOCK_KEY_B64,
+        "ciphertext": ciphertext,
+        "aad": _AAD_B64,
+        "timestamp": timestamp or _iso_timestamp(int(time.time())),
+        "request_id": request_id,
+        "device_pubkey": _PUBKEY_B64,
+    }
+    request.update(overrides)
+    return request
+
+
+def _post_chat(client, request, headers=None):
+    """POST a chat request body serialized with orjson rather than httpx's json."""
+    return client.post(
+        "/api/chat",
+        content=orjson.dumps(request),
+        headers={"Content-Type": "application/json", **(headers or {})},
+    )
+
 
 class TestE2EIntegration:
     """End-to-end integration test suite."""
 
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def test_settings(self):
         """Create test settings."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -41,16 +107,29 @@ class TestE2EIntegration:
             )
             yield settings
 
-    @pytest.fixture
-    def test_client(self, test_settings):
-        """Create test client with mocked dependencies."""
+    @pytest.fixture(scope="module")
+    def app_with_mocks(self, test_settings):
+        """Import the app once with its services replaced by mocks.
+
+        main.py builds its service singletons at import time, so the patches
+        have to be in place for that first import; the client below wraps
+        the resulting app.
+        """
         # Mock all the services that startup during app creation
-        with (
-            patch("services.inference_client.InferenceClient") as mock_inf_client,
-            patch("services.inference_service.InferenceService") as mock_inf_service,
-            patch("services.hpke_service.HPKEService") as mock_hpke_service,
-            patch("config.get_settings", return_value=test_settings),
-        ):
+        with ExitStack() as stack:
+            mock_inf_client = stack.enter_context(
+                patch("services.inference_client.InferenceClient")
+            )
+            mock_inf_service = stack.enter_context(
+                patch("services.inference_service.InferenceService")
+            )
+            mock_hpke_service = stack.enter_context(
+                patch("services.hpke_service.HPKEService")
+            )
+            stack.enter_context(
+                patch("config.get_settings", return_value=test_settings)
+            )
+
             # Setup inference client mock
             mock_inf_client_instance = Mock()
             mock_inf_client_instance.startup = AsyncMock()
@@ -91,9 +170,49 @@ class TestE2EIntegration:
             # Import main after patching
             from main import app
 
-            client = TestClient(app)
+            yield (
+                app,
+                SimpleNamespace(
+                    inference_client=mock_inf_client_instance,
+                    inference_service=mock_inf_service_instance,
+                    hpke_service=mock_hpke_service_instance,
+                ),
+            )
+
+    @pytest_asyncio.fixture(scope="module", loop_scope="module")
+    async def client(self, app_with_mocks):
+        """Client over the mocked app, shared by the module.
+
+        The service mocks are exposed as ``client.mocks``; tests that need
+        different behaviour reassign ``return_value``/``side_effect`` on them
+        rather than re-patching.
+        """
+        app, mocks = app_with_mocks
+        # ASGITransport does not send lifespan events, so the app's startup
+        # (logging setup, inference client, key rotation task) is skipped
+        # entirely rather than re-run per test; the mocked services above
+        # never need it.
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            client.mocks = mocks
             yield client
 
+    @pytest.fixture
+    def inference_mock(self, client):
+        """The module's inference client mock, restored after each test."""
+        mock = client.mocks.inference_client
+        chat_completion = mock.chat_completion
+        chat_completion_stream = mock.chat_completion_stream
+        default_response = chat_completion.return_value
+
+        yield mock
+
+        chat_completion.reset_mock(return_value=True, side_effect=True)
+        chat_completion.return_value = default_response
+        mock.chat_completion = chat_completion
+        mock.chat_completion_stream = chat_completion_stream
+
     @pytest.fixture
     def mock_inference_response(self):
         """Mock successful inference response."""
@@ -108,9 +227,9 @@ class TestE2EIntegration:
             ]
         }
 
-    def test_health_endpoint(self, test_client):
+    async def test_health_endpoint(self, client):
         """Test health check endpoint."""
-        response = test_client.get("/health")
+        response = await client.get("/health")
 
         assert response.status_code == 200
         data = response.json()
@@ -120,9 +239,9 @@ class TestE2EIntegration:
         assert "version" in data
         assert data["status"] == "healthy"
 
-    def test_pubkey_endpoint(self, test_client):
+    async def test_pubkey_endpoint(self, client):
         """Test public key retrieval endpoint."""
-        response = test_client.get("/api/pubkey")
+        response = await client.get("/api/pubkey")
 
         assert response.status_code == 200
         data = response.json()
@@ -137,17 +256,12 @@ class TestE2EIntegration:
         current_pubkey = base64.b64decode(data["current_pubkey"])
         assert len(current_pubkey) > 0
 
-    @patch("services.inference_client.InferenceClient")
-    def test_chat_endpoint_success(
-        self, mock_inference_client, test_client, mock_inference_response
+    async def test_chat_endpoint_success(
+        self, inference_mock, client, mock_inference_response
     ):
         """Test successful chat completion flow."""
         # Setup mock inference client
-        mock_client_instance = Mock()
-        mock_client_instance.chat_completion = AsyncMock(
-            return_value=mock_inference_response
-        )
-        mock_inference_client.return_value = mock_client_instance
+        inference_mock.chat_completion.return_value = mock_inference_response
 
         # Create test request payload
         test_payload = {
@@ -157,79 +271,53 @@ class TestE2EIntegration:
         }
 
         # Simulate HPKE encryption (simplified for testing)
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
-
-        request_data = {
-            "encapsulated_key": base64.b64encode(
-                b"mock_encapsulated_key_32bytes__"
-            ).decode("ascii"),
-            "ciphertext": ciphertext,
-            "aad": base64.b64encode(b"test_aad").decode("ascii"),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "request_id": "integration-test-123",
-            "device_pubkey": base64.b64encode(b"mock_device_pubkey_32bytes____").decode(
-                "ascii"
-            ),
-        }
+        request_data = _mk_request(
+            "integration-test-123",
+            _encode_payload(test_payload),
+            encapsulated_key=_ENCAPSULATED_KEY_B64,
+            device_pubkey=_DEVICE_PUBKEY_B64,
+        )
 
         # Send request
-        response = test_client.post("/api/chat", json=request_data)
+        response = await _post_chat(client, request_data)
 
         assert response.status_code == 200
 
         # Verify inference client was called
-        mock_client_instance.chat_completion.assert_called_once()
+        inference_mock.chat_completion.assert_called_once()
 
-    def test_chat_endpoint_invalid_hpke(self, test_client):
+    async def test_chat_endpoint_invalid_hpke(self, client):
         """Test chat endpoint with invalid HPKE data."""
-        request_data = {
-            "encapsulated_key": "invalid-base64!@#",
-            "ciphertext": "also-invalid!@#",
-            "aad": base64.b64encode(b"test_aad").decode("ascii"),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "request_id": "invalid-test-123",
-            "device_pubkey": base64.b64encode(b"mock_device_pubkey").decode("ascii"),
-        }
+        request_data = _mk_request(
+            "invalid-test-123",
+            "also-invalid!@#",
+            encapsulated_key="invalid-base64!@#",
+            device_pubkey=base64.b64encode(b"mock_device_pubkey").decode("ascii"),
+        )
 
-        response = test_client.post("/api/chat", json=request_data)
+        response = await _post_chat(client, request_data)
 
         assert response.status_code == 400
         data = response.json()
         assert "error" in data
 
-    def test_chat_endpoint_replay_attack(self, test_client):
+    async def test_chat_endpoint_replay_attack(self, inference_mock, client):
         """Test replay attack protection."""
-        test_payload = {"messages": [{"role": "user", "content": "Test"}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
-
-        request_data = {
-            "encapsulated_key": base64.b64encode(b"mock_key").decode("ascii"),
-            "ciphertext": ciphertext,
-            "aad": base64.b64encode(b"test_aad").decode("ascii"),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "request_id": "replay-test-456",
-            "device_pubkey": base64.b64encode(b"mock_pubkey").decode("ascii"),
-        }
+        request_data = _mk_request("replay-test-456")
 
         # First request should succeed
-        with patch("services.inference_client.InferenceClient") as mock_client:
-            mock_instance = Mock()
-            mock_instance.chat_completion = AsyncMock(
-                return_value={"choices": [{"message": {"content": "test"}}]}
-            )
-            mock_client.return_value = mock_instance
+        inference_mock.chat_completion.return_value = {
+            "choices": [{"message": {"content": "test"}}]
+        }
 
-            response1 = test_client.post("/api/chat", json=request_data)
-            assert response1.status_code == 200
+        response1 = await _post_chat(client, request_data)
+        assert response1.status_code == 200
 
         # Second request with same ID should fail
-        response2 = test_client.post("/api/chat", json=request_data)
+        response2 = await _post_chat(client, request_data)
         assert response2.status_code == 400
 
-    @patch("services.inference_client.InferenceClient")
-    def test_chat_streaming_response(self, mock_inference_client, test_client):
+    async def test_chat_streaming_response(self, inference_mock, client):
         """Test Server-Sent Events streaming response."""
 
         # Setup streaming mock
@@ -238,102 +326,88 @@ class TestE2EIntegration:
             for chunk in chunks:
                 yield {"choices": [{"delta": {"content": chunk}}]}
 
-        mock_client_instance = Mock()
-        mock_client_instance.chat_completion_stream = AsyncMock(
-            return_value=mock_stream()
-        )
-        mock_inference_client.return_value = mock_client_instance
+        # Hand over the generator function itself so chunks are iterated
+        # directly instead of through an awaited AsyncMock proxy
+        inference_mock.chat_completion_stream = mock_stream
 
         test_payload = {"messages": [{"role": "user", "content": "Stream test"}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
-
-        request_data = {
-            "encapsulated_key": base64.b64encode(b"mock_key").decode("ascii"),
-            "ciphertext": ciphertext,
-            "aad": base64.b64encode(b"test_aad").decode("ascii"),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "request_id": "stream-test-789",
-            "device_pubkey": base64.b64encode(b"mock_pubkey").decode("ascii"),
-        }
+        ciphertext = _encode_payload(test_payload)
+
+        request_data = _mk_request("stream-test-789", ciphertext)
 
         # Test streaming endpoint
-        response = test_client.post(
-            "/api/chat", json=request_data, headers={"Accept": "text/event-stream"}
+        response = await _post_chat(
+            client, request_data, headers={"Accept": "text/event-stream"}
         )
 
         assert response.status_code == 200
         assert "text/event-stream" in response.headers.get("content-type", "")
 
-    def test_rate_limiting(self, test_client):
+    async def test_rate_limiting(self, inference_mock, client):
         """Test rate limiting functionality."""
         test_payload = {"messages": [{"role": "user", "content": "Rate limit test"}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
+        ciphertext = _encode_payload(test_payload)
 
-        # Send multiple requests rapidly
-        requests_sent = 0
-
-        with patch("services.inference_client.InferenceClient") as mock_client:
-            mock_instance = Mock()
-            mock_instance.chat_completion = AsyncMock(
-                return_value={"choices": [{"message": {"content": "test"}}]}
-            )
-            mock_client.return_value = mock_instance
-
-            for i in range(10):  # Send 10 requests quickly
-                request_data = {
-                    "encapsulated_key": base64.b64encode(b"mock_key").decode("ascii"),
-                    "ciphertext": ciphertext,
-                    "aad": base64.b64encode(b"test_aad").decode("ascii"),
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "request_id": f"rate-limit-test-{i}",
-                    "device_pubkey": base64.b64encode(b"mock_pubkey").decode("ascii"),
-                }
-
-                response = test_client.post("/api/chat", json=request_data)
-                requests_sent += 1
+        # Send multiple requests concurrently
+        inference_mock.chat_completion.return_value = {
+            "choices": [{"message": {"content": "test"}}]
+        }
 
-                if response.status_code == 429:  # Rate limited
-                    break
+        requests = [
+            _mk_request(f"rate-limit-test-{i}", ciphertext)
+            for i in range(10)  # Send 10 requests at once
+        ]
+        responses = await asyncio.gather(*[_post_chat(client, r) for r in requests])
+        requests_sent = len(responses)
 
         # Should have sent some requests successfully
         assert requests_sent > 0
 
-    @patch("services.inference_client.InferenceClient")
-    def test_circuit_breaker_behavior(self, mock_inference_client, test_client):
-        """Test circuit breaker functionality."""
-        # Setup mock to fail consistently
-        mock_client_instance = Mock()
-        mock_client_instance.chat_completion = AsyncMock(
-            side_effect=Exception("Inference server down")
+    async def test_circuit_breaker_behavior(self, client, test_settings):
+        """Test that the breaker opens at the threshold and stops reaching inference."""
+        import main
+        from models import DecryptedChatPayload
+        from services.circuit_breaker import CircuitBreaker
+
+        threshold = test_settings.CIRCUIT_BREAKER_THRESHOLD
+        mocks = client.mocks
+
+        # Fail on the path /api/chat actually streams through, counting how
+        # often it is reached
+        call_count = 0
+
+        async def failing_stream(*args, **kwargs):
+            nonlocal call_count
+            call_count += 1
+            raise Exception("Inference server down")
+            yield  # pragma: no cover - makes this an async generator
+
+        payload = DecryptedChatPayload(
+            messages=[{"role": "user", "content": "Circuit breaker test"}]
         )
-        mock_inference_client.return_value = mock_client_instance
 
-        test_payload = {
-            "messages": [{"role": "user", "content": "Circuit breaker test"}]
-        }
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
-
-        # Send multiple requests to trigger circuit breaker
-        for i in range(5):
-            request_data = {
-                "encapsulated_key": base64.b64encode(b"mock_key").decode("ascii"),
-                "ciphertext": ciphertext,
-                "aad": base64.b64encode(b"test_aad").decode("ascii"),
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "request_id": f"circuit-test-{i}",
-                "device_pubkey": base64.b64encode(b"mock_pubkey").decode("ascii"),
-            }
-
-            response = test_client.post("/api/chat", json=request_data)
-            # Should return 500 or 503 (service unavailable)
-            assert response.status_code in [500, 503]
-
-    def test_metrics_endpoint(self, test_client):
+        # Earlier tests in the module share the app's breaker, so start this
+        # one from a fresh closed breaker
+        with (
+            patch.object(main, "circuit_breaker", CircuitBreaker(test_settings)),
+            patch.object(mocks.inference_service, "stream_inference", failing_stream),
+            patch.object(mocks.hpke_service, "decrypt_request", return_value=payload),
+        ):
+            # Sequential so the breaker state seen by each request is fixed
+            responses = [
+                await _post_chat(client, _mk_request(f"circuit-test-{i}"))
+                for i in range(threshold + 3)
+            ]
+
+        # Every request up to the threshold reaches inference and fails
+        assert call_count == threshold
+        # Once open, the breaker answers 503 without reaching inference
+        for response in responses[threshold:]:
+            assert response.status_code == 503
+
+    async def test_metrics_endpoint(self, client):
         """Test metrics endpoint for monitoring."""
-        response = test_client.get("/metrics")
+        response = await client.get("/metrics")
 
         assert response.status_code == 200
 
@@ -341,132 +415,86 @@ class TestE2EIntegration:
         content = response.text
         assert "# HELP" in content or "# TYPE" in content
 
-    def test_malformed_json_request(self, test_client):
+    async def test_malformed_json_request(self, client):
         """Test handling of malformed JSON requests."""
         # Send invalid JSON
-        response = test_client.post(
+        response = await client.post(
             "/api/chat",
-            data="invalid json data",
+            content="invalid json data",
             headers={"Content-Type": "application/json"},
         )
 
         assert response.status_code == 422  # Unprocessable Entity
 
-    def test_missing_required_fields(self, test_client):
+    async def test_missing_required_fields(self, client):
         """Test handling of requests with missing required fields."""
         incomplete_request = {
-            "encapsulated_key": base64.b64encode(b"mock_key").decode("ascii"),
+            "encapsulated_key": _MOCK_KEY_B64,
             # Missing ciphertext, aad, timestamp, etc.
         }
 
-        response = test_client.post("/api/chat", json=incomplete_request)
+        response = await _post_chat(client, incomplete_request)
 
         assert response.status_code == 422
         data = response.json()
         assert "detail" in data
 
-    @patch("services.inference_client.InferenceClient")
-    def test_inference_server_timeout(self, mock_inference_client, test_client):
+    async def test_inference_server_timeout(self, inference_mock, client):
         """Test handling of inference server timeouts."""
         # Setup mock to timeout
-        mock_client_instance = Mock()
-        mock_client_instance.chat_completion = AsyncMock(
-            side_effect=asyncio.TimeoutError("Request timeout")
+        inference_mock.chat_completion.side_effect = asyncio.TimeoutError(
+            "Request timeout"
         )
-        mock_inference_client.return_value = mock_client_instance
 
         test_payload = {"messages": [{"role": "user", "content": "Timeout test"}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
-
-        request_data = {
-            "encapsulated_key": base64.b64encode(b"mock_key").decode("ascii"),
-            "ciphertext": ciphertext,
-            "aad": base64.b64encode(b"test_aad").decode("ascii"),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "request_id": "timeout-test-123",
-            "device_pubkey": base64.b64encode(b"mock_pubkey").decode("ascii"),
-        }
+        ciphertext = _encode_payload(test_payload)
+
+        request_data = _mk_request("timeout-test-123", ciphertext)
 
-        response = test_client.post("/api/chat", json=request_data)
+        response = await _post_chat(client, request_data)
 
         assert response.status_code in [504, 500]  # Gateway timeout or internal error
 
-    def test_large_payload_handling(self, test_client):
+    async def test_large_payload_handling(self, inference_mock, client):
         """Test handling of large payloads."""
-        # Create large message content
-        large_content = "A" * 10000  # 10KB message
-
-        test_payload = {"messages": [{"role": "user", "content": large_content}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
-
-        request_data = {
-            "encapsulated_key": base64.b64encode(b"mock_key").decode("ascii"),
-            "ciphertext": ciphertext,
-            "aad": base64.b64encode(b"test_aad").decode("ascii"),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "request_id": "large-payload-test",
-            "device_pubkey": base64.b64encode(b"mock_pubkey").decode("ascii"),
-        }
+        request_data = _mk_request(
+            "large-payload-test", ciphertext=_LARGE_CIPHERTEXT_B64
+        )
 
-        with patch("services.inference_client.InferenceClient") as mock_client:
-            mock_instance = Mock()
-            mock_instance.chat_completion = AsyncMock(
-                return_value={"choices": [{"message": {"content": "Response"}}]}
-            )
-            mock_client.return_value = mock_instance
+        inference_mock.chat_completion.return_value = {
+            "choices": [{"message": {"content": "Response"}}]
+        }
 
-            response = test_client.post("/api/chat", json=request_data)
+        response = await _post_chat(client, request_data)
 
-            # Should handle large payloads or return appropriate error
-            assert response.status_code in [200, 413]  # OK or Payload Too Large
+        # Should handle large payloads or return appropriate error
+        assert response.status_code in [200, 413]  # OK or Payload Too Large
 
-    @patch("services.inference_client.InferenceClient")
-    def test_concurrent_requests(self, mock_inference_client, test_client):
+    async def test_concurrent_requests(self, inference_mock, client):
         """Test handling of concurrent requests."""
-        mock_client_instance = Mock()
-        mock_client_instance.chat_completion = AsyncMock(
-            return_value={"choices": [{"message": {"content": "Concurrent test"}}]}
-        )
-        mock_inference_client.return_value = mock_client_instance
+        inference_mock.chat_completion.return_value = {
+            "choices": [{"message": {"content": "Concurrent test"}}]
+        }
 
         test_payload = {"messages": [{"role": "user", "content": "Concurrent test"}]}
-        payload_json = json.dumps(test_payload)
-        ciphertext = base64.b64encode(payload_json.encode("utf-8")).decode("ascii")
+        ciphertext = _encode_payload(test_payload)
 
         # Send multiple concurrent requests
-        responses = []
-        for i in range(5):
-            request_data = {
-                "encapsulated_key": base64.b64encode(b"mock_key").decode("ascii"),
-                "ciphertext": ciphertext,
-                "aad": base64.b64encode(b"test_aad").decode("ascii"),
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "request_id": f"concurrent-test-{i}",
-                "device_pubkey": base64.b64encode(b"mock_pubkey").decode("ascii"),
-            }
-
-            response = test_client.post("/api/chat", json=request_data)
-            responses.append(response)
+        requests = [_mk_request(f"concurrent-test-{i}", ciphertext) for i in range(5)]
+        responses = await asyncio.gather(*[_post_chat(client, r) for r in requests])
 
         # All requests should be handled successfully
         for response in responses:
             assert response.status_code == 200
 
-    def test_error_response_format(self, test_client):
+    async def test_error_response_format(self, client):
         """Test that error responses follow consistent format."""
         # Trigger an error with invalid data
-        request_data = {
-            "encapsulated_key": "invalid-base64",
-            "ciphertext": "invalid-base64",
-            "aad": base64.b64encode(b"test_aad").decode("ascii"),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "request_id": "error-format-test",
-            "device_pubkey": base64.b64encode(b"mock_pubkey").decode("ascii"),
-        }
+        request_data = _mk_request(
+            "error-format-test", "invalid-base64", encapsulated_key="invalid-base64"
+        )
 
-        response = test_client.post("/api/chat", json=request_data)
+        response = await _post_chat(client, request_data)
 
         assert response.status_code == 400
         data = response.json()
@@ -479,9 +507,9 @@ class TestE2EIntegration:
         assert "base64" not in data["error"].lower()
         assert "traceback" not in data
 
-    def test_cors_headers(self, test_client):
+    async def test_cors_headers(self, client):
         """Test CORS headers are properly set."""
-        response = test_client.options("/api/chat")
+        response = await client.options("/api/chat")
 
         # Should include appropriate CORS headers for security
         headers = response.headers
@@ -492,9 +520,9 @@ class TestE2EIntegration:
             origin = headers["access-control-allow-origin"]
             assert origin != "*"  # Should not allow all origins
 
-    def test_security_headers(self, test_client):
+    async def test_security_headers(self, client):
         """Test that appropriate security headers are set."""
-        response = test_client.get("/health")
+        response = await client.get("/health")
 
         headers = response.headers
 
@@ -5,44 +5,106 @@ Validates code structure and implementation without requiring running servers.
 """
 
 import ast
+import contextlib
+import functools
+import io
 import os
+import re
 import sys
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+
+@functools.lru_cache(maxsize=None)
+def _maybe_read(filepath: str) -> Optional[str]:
+    """Read a source file once, or return None if it can't be opened."""
+    try:
+        return Path(filepath).read_text(encoding='utf-8')
+    except OSError:
+        return None
+
+
+def _read(filepath: str) -> str:
+    """Return the cached text of a source file, raising if it is missing."""
+    content = _maybe_read(filepath)
+    if content is None:
+        raise FileNotFoundError(filepath)
+    return content
+
+
+@functools.lru_cache(maxsize=None)
+def _parse(filepath: str) -> ast.Module:
+    """Parse a source file once, reusing the cached text."""
+    return ast.parse(_read(filepath))
+
+
+def _find_needles(content: str, needles: Tuple[str, ...]) -> set:
+    """Return which needles occur in content using one regex sweep.
+
+    The lookahead lets matches overlap; a needle hidden behind another
+    alternative at the same offset is re-checked directly, so the result is
+    exact.
+    """
+    pattern = re.compile(
+        "(?=(" + "|".join(map(re.escape, sorted(needles, key=len, reverse=True))) + "))"
+    )
+    found = {match.group(1) for match in pattern.finditer(content)}
+    found.update(n for n in needles if n not in found and n in content)
+    return found
+
+
+def _run_checks(content: str, checks: List[Tuple[str, Tuple[str, ...]]]) -> bool:
+    """Print a pass/fail line per check; a check passes if all its needles occur."""
+    found = _find_needles(
+        content, tuple({needle for _, needles in checks for needle in needles})
+    )
+    all_passed = True
+    for name, needles in checks:
+        if all(needle in found for needle in needles):
+            print(f"✅ {name}")
+        else:
+            print(f"❌ {name}")
+            all_passed = False
+    return all_passed
+
+
+class _DefinitionExtractor(ast.NodeVisitor):
+    """Collect top-level classes, functions and imports without walking bodies."""
+
+    def __init__(self):
+        self.classes = []
+        self.functions = []
+        self.imports = []
+
+    def visit_ClassDef(self, node):
+        self.classes.append(node.name)
+        # Also collect methods within classes
+        for item in node.body:
+            if isinstance(item, ast.FunctionDef):
+                self.functions.append(f"{node.name}.{item.name}")
+
+    def visit_FunctionDef(self, node):
+        self.functions.append(node.name)
+
+    def visit_Import(self, node):
+        self.imports.extend(alias.name for alias in node.names)
+
+    def visit_ImportFrom(self, node):
+        module = node.module or ''
+        self.imports.extend(f"{module}.{alias.name}" for alias in node.names)
 
 
 def analyze_python_file(filepath: str) -> Dict[str, Any]:
     """Analyze a Python file and extract key information."""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        tree = ast.parse(content)
-        
-        classes = []
-        functions = []
-        imports = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                classes.append(node.name)
-                # Also collect methods within classes
-                for item in node.body:
-                    if isinstance(item, ast.FunctionDef):
-                        functions.append(f"{node.name}.{item.name}")
-            elif isinstance(node, ast.FunctionDef):
-                functions.append(node.name)
-            elif isinstance(node, ast.Import):
-                for alias in node.names:
-                    imports.append(alias.name)
-            elif isinstance(node, ast.ImportFrom):
-                module = node.module or ''
-                for alias in node.names:
-                    imports.append(f"{module}.{alias.name}")
+        content = _read(filepath)
+        extractor = _DefinitionExtractor()
+        extractor.visit(_parse(filepath))
         
         return {
-            'classes': classes,
-            'functions': functions,
-            'imports': imports,
+            'classes': extractor.classes,
+            'functions': extractor.functions,
+            'imports': extractor.imports,
             'lines': len(content.splitlines())
         }
     
@@ -55,32 +117,23 @@ def validate_inference_service():
     print("=== Validating InferenceService ===")
     
     service_path = "services/inference_service.py"
-    if not os.path.exists(service_path):
+    if (content := _maybe_read(service_path)) is None:
         print("❌ InferenceService file not found")
         return False
     
-    with open(service_path, 'r') as f:
-        content = f.read()
-    
     checks = [
-        ("InferenceService class", "class InferenceService" in content),
-        ("stream_inference method", "async def stream_inference" in content),
-        ("startup method", "async def startup" in content),
-        ("shutdown method", "async def shutdown" in content), 
-        ("health_check method", "async def health_check" in content),
-        ("SSE parsing", "data.strip() == \"[DONE]\"" in content),
-        ("Token streaming", "yield token" in content),
-        ("Budget timeout", "REQUEST_BUDGET_SECONDS" in content),
-        ("Client disconnect", "request_deadline" in content)
+        ("InferenceService class", ("class InferenceService",)),
+        ("stream_inference method", ("async def stream_inference",)),
+        ("startup method", ("async def startup",)),
+        ("shutdown method", ("async def shutdown",)),
+        ("health_check method", ("async def health_check",)),
+        ("SSE parsing", ("data.strip() == _DONE",)),
+        ("Token streaming", ("yield token",)),
+        ("Budget timeout", ("REQUEST_BUDGET_SECONDS",)),
+        ("Client disconnect", ("request_deadline",))
     ]
     
-    all_passed = True
-    for name, check in checks:
-        if check:
-            print(f"✅ {name}")
-        else:
-            print(f"❌ {name}")
-            all_passed = False
+    all_passed = _run_checks(content, checks)
     
     lines = len(content.splitlines())
     print(f"✅ {lines} lines of code")
@@ -92,30 +145,19 @@ def validate_models():
     print("\n=== Validating Models ===")
     
     models_path = "models.py"
-    if not os.path.exists(models_path):
+    if (content := _maybe_read(models_path)) is None:
         print("❌ Models file not found")
         return False
     
-    with open(models_path, 'r') as f:
-        content = f.read()
-    
     checks = [
-        ("InferenceRequest", "class InferenceRequest" in content),
-        ("Parameter guardrails", "model_post_init" in content),
-        ("Temperature clamping", "temperature" in content and "1.5" in content),
-        ("Top_p clamping", "top_p" in content and "0.95" in content),
-        ("Max_tokens clamping", "max_tokens" in content and "4096" in content)
+        ("InferenceRequest", ("class InferenceRequest",)),
+        ("Parameter guardrails", ("model_post_init",)),
+        ("Temperature clamping", ("temperature", "1.5")),
+        ("Top_p clamping", ("top_p", "0.95")),
+        ("Max_tokens clamping", ("max_tokens", "4096"))
     ]
     
-    all_passed = True
-    for name, check in checks:
-        if check:
-            print(f"✅ {name}")
-        else:
-            print(f"❌ {name}")
-            all_passed = False
-    
-    return all_passed
+    return _run_checks(content, checks)
 
 
 def validate_main_app():
@@ -123,32 +165,21 @@ def validate_main_app():
     print("\n=== Validating Main Application ===")
     
     main_path = "main.py"
-    if not os.path.exists(main_path):
+    if (content := _maybe_read(main_path)) is None:
         print("❌ Main application file not found")
         return False
     
-    with open(main_path, 'r') as f:
-        content = f.read()
-    
     checks = [
-        ("InferenceService import", "from services.inference_service import InferenceService" in content),
-        ("InferenceService initialization", "inference_service = InferenceService" in content),
-        ("Inference endpoint", "@app.post(\"/inference\")" in content),
-        ("Updated /api/chat", "inference_service.stream_inference" in content),
-        ("Per-chunk encryption", "encrypt_chunk" in content and "chunk_sequence" in content),
-        ("Parameter guardrails usage", "InferenceRequest(" in content),
-        ("SSE event streaming", "EventSourceResponse" in content)
+        ("InferenceService import", ("from services.inference_service import InferenceService",)),
+        ("InferenceService initialization", ("inference_service = InferenceService",)),
+        ("Inference endpoint", ("@app.post(\"/inference\")",)),
+        ("Updated /api/chat", ("inference_service.stream_inference",)),
+        ("Per-chunk encryption", ("encrypt_chunk", "chunk_sequence")),
+        ("Parameter guardrails usage", ("InferenceRequest(",)),
+        ("SSE event streaming", ("EventSourceResponse",))
     ]
     
-    all_passed = True
-    for name, check in checks:
-        if check:
-            print(f"✅ {name}")
-        else:
-            print(f"❌ {name}")
-            all_passed = False
-    
-    return all_passed
+    return _run_checks(content, checks)
 
 
 def validate_test_files():
@@ -162,7 +193,7 @@ def validate_test_files():
     
     all_passed = True
     for test_file in test_files:
-        if os.path.exists(test_file):
+        if _maybe_read(test_file) is not None:
             analysis = analyze_python_file(test_file)
             if 'error' not in analysis:
                 print(f"✅ {test_file} ({analysis['lines']} lines)")
@@ -224,5 +255,9 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    # Collect the report and write it in one go instead of flushing per line
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        success = main()
+    sys.stdout.write(buffer.getvalue())
     sys.exit(0 if success else 1)
\ No newline at end of file